@@ -0,0 +1,561 @@
+"""Headless benchmarks of the editor's hot paths on synthetic scenes.
+
+Scenes of mixed rectangles, ellipses, lines, texts and images are built
+through GraphicObjectFactory.create_graphic_object inside a real
+VectorGraphicEditor whose Tk widgets are replaced by recording stand-ins,
+so no display is needed and every canvas call is counted:
+
+    python bench.py                         # 1k, 10k and 100k objects
+    python bench.py --sizes 1000 1000000 -o results.json
+    python bench.py -o new.json --compare old.json
+
+Near the end of each size the scene is saved as a document, opened and
+saved again; the ``identical`` field of document_roundtrip says whether the
+two files match byte for byte (the exit status is 1 when they do not). The
+reopened scene, whose images are embedded in the document, is then
+exported to PNG (export_png).
+
+Cold start is timed first, in fresh interpreters: importing the editor
+(object count 0, operation startup_import) and constructing it
+(startup_editor), with the modules Pillow and svg loaded by then, which
+should be none. There is no display, so startup_editor is not the time to
+the first frame: make_editor runs the idle callbacks too, so it includes the
+work the editor defers until after that frame, such as the property panel.
+
+Results are JSON: one entry per (scene size, operation) with wall times in
+milliseconds and the canvas calls the operation made. --compare prints the
+ratio of every operation's median time against an earlier results file, to
+compare two revisions of the editor.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+import main
+
+SIZES = (1000, 10000, 100000)
+TYPES = ('rectangle', 'ellipse', 'line', 'text', 'image')
+COLORS = ('black', 'red', 'green', 'blue', '#ff8800', '#336699')
+OBJECT_SPACING = 40  # average distance between objects, so a window shows a few hundred
+LAZY_MODULES = ('PIL', 'renderer', 'svg')  # must not be loaded by startup alone
+
+# Run in a fresh interpreter, so the imports are not already cached
+STARTUP = """
+import json, sys, time
+start = time.perf_counter()
+import bench
+imported = time.perf_counter()
+bench.make_editor()
+ready = time.perf_counter()
+print(json.dumps({'import': (imported - start) * 1000, 'editor': (ready - imported) * 1000,
+                  'loaded': [name for name in bench.LAZY_MODULES if name in sys.modules]}))
+"""
+
+
+class RecordingCanvas():
+    """Stand-in for tk.Canvas that keeps item state and counts every call."""
+    def __init__(self, width=800, height=600):
+        self.width = width
+        self.height = height
+        self.calls = Counter()
+        self.items = {}  # item id -> [coords, options, tags]
+        self.lower = {}  # item id -> item directly below it
+        self.upper = {}  # item id -> item directly above it
+        self.base = None  # bottom item
+        self.top = None
+        self.next_id = 1
+        self.offset_x = 0
+        self.offset_y = 0
+        self.scrollregion = (0, 0, width, height)
+        self.mark = (0, 0)
+
+    def create(self, kind, coords, options):
+        self.calls['create_' + kind] += 1
+        item = self.next_id
+        self.next_id += 1
+        tags = options.pop('tags', ())
+        self.items[item] = [list(coords), options, (tags,) if isinstance(tags, str) else tuple(tags)]
+        self.link(item, self.top)
+        return item
+
+    def create_rectangle(self, *coords, **options):
+        return self.create('rectangle', coords, options)
+
+    def create_oval(self, *coords, **options):
+        return self.create('oval', coords, options)
+
+    def create_line(self, *coords, **options):
+        return self.create('line', coords, options)
+
+    def create_text(self, *coords, **options):
+        return self.create('text', coords, options)
+
+    def create_image(self, *coords, **options):
+        return self.create('image', coords, options)
+
+    def coords(self, item, *coords):
+        self.calls['coords'] += 1
+        if not coords:
+            return self.items[item][0]
+        self.items[item][0] = list(coords)
+
+    def itemconfig(self, item, **options):
+        self.calls['itemconfig'] += 1
+        self.items[item][1].update(options)
+
+    def delete(self, *targets):
+        self.calls['delete'] += 1
+        for target in targets:
+            if target == 'all':
+                items = list(self.items)
+            elif isinstance(target, str):
+                items = [item for item, (_, _, tags) in self.items.items() if target in tags]
+            else:
+                items = [target] if target in self.items else []
+            for item in items:
+                self.unlink(item)
+                del self.items[item]
+
+    ## Stacking order, a linked list like Tk's display list
+    def link(self, item, below):
+        # Insert item directly above below (None: at the bottom)
+        above = self.upper[below] if below is not None else self.base
+        self.lower[item] = below
+        self.upper[item] = above
+        if below is not None:
+            self.upper[below] = item
+        else:
+            self.base = item
+        if above is not None:
+            self.lower[above] = item
+        else:
+            self.top = item
+
+    def unlink(self, item):
+        below, above = self.lower.pop(item), self.upper.pop(item)
+        if below is not None:
+            self.upper[below] = above
+        else:
+            self.base = above
+        if above is not None:
+            self.lower[above] = below
+        else:
+            self.top = below
+
+    def find_all(self):
+        items = []
+        item = self.base
+        while item is not None:
+            items.append(item)
+            item = self.upper[item]
+        return tuple(items)
+
+    def find_withtag(self, tag):
+        return tuple(item for item in self.find_all() if tag in self.items[item][2])
+
+    def tag_raise(self, item, above=None):
+        self.calls['tag_raise'] += 1
+        if above is None:
+            above = self.top
+        if above != item:
+            self.unlink(item)
+            self.link(item, above)
+
+    def tag_lower(self, item, below=None):
+        self.calls['tag_lower'] += 1
+        if below != item:
+            self.unlink(item)
+            self.link(item, self.lower[below] if below is not None else None)
+
+    def canvasx(self, x):
+        return x + self.offset_x
+
+    def canvasy(self, y):
+        return y + self.offset_y
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def config(self, scrollregion=None, **options):
+        if scrollregion is not None:
+            self.scrollregion = scrollregion
+
+    configure = config
+
+    def xview_moveto(self, fraction):
+        x0, _, x1, _ = self.scrollregion
+        self.offset_x = x0 + fraction * (x1 - x0)
+
+    def yview_moveto(self, fraction):
+        _, y0, _, y1 = self.scrollregion
+        self.offset_y = y0 + fraction * (y1 - y0)
+
+    def xview(self, *args):
+        if args[:1] == ('scroll',):
+            self.offset_x += int(args[1]) * 10
+
+    def yview(self, *args):
+        if args[:1] == ('scroll',):
+            self.offset_y += int(args[1]) * 10
+
+    def scan_mark(self, x, y):
+        self.mark = (x, y)
+
+    def scan_dragto(self, x, y, gain=10):
+        self.offset_x -= (x - self.mark[0]) * gain
+        self.offset_y -= (y - self.mark[1]) * gain
+        self.mark = (x, y)
+
+    def bind(self, sequence, func):
+        pass
+
+    def unbind(self, sequence):
+        pass
+
+    def pack(self, **options):
+        pass
+
+
+class RecordingWidget():
+    """Stand-in for labels and buttons; keeps the last configuration."""
+    def __init__(self, **options):
+        self.options = options
+
+    def config(self, **options):
+        self.options.update(options)
+
+    configure = config
+
+    def set(self, *args):
+        self.options['set'] = args
+
+    def pack(self, **options):
+        pass
+
+
+class RecordingPhoto():
+    """Stand-in for ImageTk.PhotoImage, which needs a Tk interpreter."""
+    def __init__(self, image):
+        self.size = image.size
+
+    def width(self):
+        return self.size[0]
+
+    def height(self):
+        return self.size[1]
+
+
+class RecordingFont():
+    """Stand-in for tkinter.font.Font with fixed-pitch metrics; counts measure calls."""
+    measured = 0
+
+    def __init__(self, family, size):
+        self.size = size
+
+    def measure(self, text):
+        RecordingFont.measured += 1
+        return round(len(text) * self.size * 0.8)
+
+    def metrics(self, name):
+        return round(self.size * 4 / 3)
+
+
+class RecordingRoot():
+    """Stand-in for tk.Tk: callbacks queue up until run() drains them."""
+    def __init__(self):
+        self.pending = {}
+        self.next_id = 1
+
+    def title(self, text):
+        pass
+
+    def bind(self, sequence, func):
+        pass
+
+    def after(self, ms, func, *args):
+        after_id = self.next_id
+        self.next_id += 1
+        self.pending[after_id] = (func, args)
+        return after_id
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def run(self):
+        while self.pending:
+            after_id = next(iter(self.pending))
+            func, args = self.pending.pop(after_id)
+            func(*args)
+
+
+class HeadlessEditor(main.VectorGraphicEditor):
+    """The editor with its Tk widgets replaced by recording stand-ins."""
+    def build_toolbar(self):
+        self.mode_label = RecordingWidget()
+        self.latency_label = RecordingWidget()
+
+    def build_property_panel(self):
+        self.inspector = main.SelectionInspector(RecordingWidget(), RecordingCanvas(), RecordingWidget())
+
+    def build_canvas(self):
+        self.canvas = RecordingCanvas()
+
+
+class Event():
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+def make_editor():
+    main.image_cache = main.ImageCache()
+    main.image_cache.photo_type = RecordingPhoto
+    main.text_layouts = main.TextLayoutCache()
+    main.text_layouts.font_type = RecordingFont
+    root = RecordingRoot()
+    editor = HeadlessEditor(root)
+    editor.on_configure(None)  # the first <Configure> of a mapped window
+    editor.on_first_expose(None)  # and its first <Expose>
+    root.run()
+    return editor
+
+
+def sample_images(directory, count=4):
+    from PIL import Image
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"image{i}.png")
+        Image.new('RGB', (16 + 16 * i, 16 + 8 * i), COLORS[i % len(COLORS)]).save(path)
+        paths.append(path)
+    return paths
+
+
+def build_scene(editor, size, images, side, rng):
+    # One transaction, as when a document is loaded: each object is drawn once at the end
+    factory = main.GraphicObjectFactory()
+    with editor.transaction():
+        for i in range(size):
+            obj_type = TYPES[i % len(TYPES)]
+            x, y = rng.uniform(0, side), rng.uniform(0, side)
+            w, h = rng.uniform(5, 60), rng.uniform(5, 60)
+            obj = factory.create_graphic_object(editor.canvas, x, y, x + w, y + h, rng.choice(COLORS), obj_type,
+                                                text=f"text {i}", image_path=images[i % len(images)])
+            editor.add_object(obj)
+
+
+def measure(editor, func, repeat):
+    """Run func repeat times; return wall times (ms) and the canvas calls of one run."""
+    times = []
+    calls = None
+    for _ in range(repeat):
+        gc.collect()
+        before = Counter(editor.canvas.calls)
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+        if calls is None:
+            calls = dict(editor.canvas.calls - before)
+    return times, calls
+
+
+def result(size, operation, times, calls, per=1):
+    return {
+        'objects': size,
+        'operation': operation,
+        'runs': len(times),
+        'per_run': per,
+        'median_ms': statistics.median(times),
+        'min_ms': min(times),
+        'max_ms': max(times),
+        'canvas_calls': calls,
+    }
+
+
+def bench_size(size, images, repeat, seed):
+    rng = random.Random(seed)
+    editor = make_editor()
+    results = []
+
+    side = OBJECT_SPACING * size ** 0.5
+    times, calls = measure(editor, lambda: build_scene(editor, size, images, side, rng), 1)
+    results.append(result(size, 'create', times, calls, per=size))
+
+    # Random z values; each call refiles one object and moves at most its own item
+    values = [rng.randrange(size) for _ in editor.objects]
+    def set_z():
+        for obj, z in zip(editor.objects, values):
+            obj.set_z_order(z)
+    times, calls = measure(editor, set_z, 1)
+    results.append(result(size, 'set_z_order', times, calls, per=size))
+    times, calls = measure(editor, editor.draw_by_z_order, repeat)
+    results.append(result(size, 'draw_by_z_order', times, calls))
+
+    shown = list(editor.store.view.shown)
+    for operation in ('bring_forward', 'send_backward', 'bring_to_front', 'send_to_back'):
+        def reorder():
+            editor.selected_objects = [rng.choice(shown)]
+            getattr(editor, operation)()
+        times, calls = measure(editor, reorder, repeat)
+        results.append(result(size, operation, times, calls))
+
+    queries = 1000
+    points = [(rng.uniform(0, side), rng.uniform(0, side)) for _ in range(queries)]
+    times, calls = measure(editor, lambda: [editor.find_closest(x, y) for x, y in points], repeat)
+    results.append(result(size, 'find_closest', times, calls, per=queries))
+
+    # Rubber-band selections covering about a tenth of the scene
+    band = side * 0.1 ** 0.5
+    def multiselect():
+        x, y = rng.uniform(0, side - band), rng.uniform(0, side - band)
+        editor.start_x, editor.start_y = x, y
+        editor.multiselect_object(Event(x + band - editor.canvas.offset_x, y + band - editor.canvas.offset_y))
+    times, calls = measure(editor, multiselect, repeat)
+    results.append(result(size, 'multiselect_object', times, calls))
+
+    # Dragging one object 30 steps; each step snaps it against every other object
+    steps = 30
+    def drag():
+        x, y = rng.choice(shown).get_obj_center()
+        x, y = x - editor.canvas.offset_x, y - editor.canvas.offset_y
+        editor.on_press(Event(x, y))
+        for i in range(1, steps + 1):
+            editor.drag_selection(Event(x + 2.5 * i, y + 1.5 * i))
+        editor.on_release(Event(x + 2.5 * steps, y + 1.5 * steps))
+    editor.set_mode('select')
+    times, calls = measure(editor, drag, repeat)
+    results.append(result(size, 'drag_snapping', times, calls, per=steps))
+    editor.set_mode('rectangle')
+
+    editor.selected_objects = rng.sample(editor.objects, max(1, size // 10))
+    for mode, numbers in (('position', ('10', '20')), ('size', ('30', '40')), ('z-order', ('5', '0'))):
+        editor.modify_mode = mode
+        times, calls = measure(editor, lambda: editor.get_numbers(*numbers), repeat)
+        results.append(result(size, f'get_numbers_{mode}', times, calls, per=len(editor.selected_objects)))
+
+    times, calls = measure(editor, editor.update_all_frame, repeat)
+    results.append(result(size, 'update_all_frame', times, calls, per=len(editor.selected_objects)))
+
+    # Save, open and save again, with an image embedded in the document; both files must be identical
+    with open(images[0], 'rb') as f:
+        data = f.read()
+    with editor.transaction():
+        editor.add_object(main.ImageObject(editor.canvas, 0, 0, None, image_data=data))
+    first, second = (os.path.join(os.path.dirname(images[0]), f"roundtrip{i}.vgd") for i in (1, 2))
+    def roundtrip():
+        editor.save_document(first)
+        editor.open_document(first)
+        editor.root.run()  # the chunked load
+        editor.save_document(second)
+    times, calls = measure(editor, roundtrip, 1)
+    entry = result(size, 'document_roundtrip', times, calls, per=len(editor.objects))
+    with open(first, 'rb') as a, open(second, 'rb') as b:
+        entry['identical'] = a.read() == b.read()
+    results.append(entry)
+
+    # Export the reopened scene, whose images are all embedded in the document
+    import renderer
+    target = os.path.join(os.path.dirname(images[0]), "export.png")
+    times, calls = measure(editor, lambda: renderer.render_objects(editor.objects).save(target), 1)
+    results.append(result(size, 'export_png', times, calls, per=len(editor.objects)))
+    return results
+
+
+def bench_startup(repeat):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', STARTUP], capture_output=True, text=True,
+                                cwd=directory, check=True).stdout
+        runs.append(json.loads(output))
+    results = []
+    for operation, key in (('startup_import', 'import'), ('startup_editor', 'editor')):
+        entry = result(0, operation, [run[key] for run in runs], {})
+        entry['loaded_modules'] = sorted({name for run in runs for name in run['loaded']})
+        results.append(entry)
+    return results
+
+
+def revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes=SIZES, repeat=5, seed=0):
+    with tempfile.TemporaryDirectory() as directory:
+        images = sample_images(directory)
+        results = bench_startup(repeat)
+        for size in sizes:
+            results += bench_size(size, images, repeat, seed)
+    return {
+        'revision': revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+
+
+def compare(report, baseline):
+    old = {(r['objects'], r['operation']): r['median_ms'] for r in baseline['results']}
+    lines = [f"{'objects':>8}  {'operation':<28}{'old ms':>10}{'new ms':>10}{'ratio':>8}"]
+    for r in report['results']:
+        before = old.get((r['objects'], r['operation']))
+        if before is None:
+            continue
+        ratio = r['median_ms'] / before if before else float('inf')
+        lines.append(f"{r['objects']:>8}  {r['operation']:<28}{before:>10.2f}{r['median_ms']:>10.2f}{ratio:>8.2f}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the editor on synthetic scenes without a display.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help="scene sizes (default: 1000 10000 100000)")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="runs of each repeatable operation (default: 5)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic scenes")
+    parser.add_argument('-o', '--output', help="write the JSON results here instead of stdout")
+    parser.add_argument('--compare', help="earlier JSON results to compare against")
+    return parser.parse_args(argv)
+
+
+def bench_main(argv=None):
+    args = parse_args(argv)
+    report = run(args.sizes, args.repeat, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(report, json.load(f)), file=sys.stderr)
+    changed = [r['objects'] for r in report['results'] if r.get('identical') is False]
+    if changed:
+        print(f"document round trip changed the file at sizes {changed}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(bench_main())
@@ -0,0 +1,224 @@
+"""Compact binary document format (.vgd).
+
+Layout, little-endian, every section 8-byte aligned:
+
+    header   magic, version, canvas size, section counts and offsets
+    records  fixed-width table with one RECORD_DTYPE row per object
+    strings  u64 offset table (count + 1 entries) followed by UTF-8 bytes;
+             holds colors, texts and image names, deduplicated
+    blobs    u64 offset table followed by the raw image file bytes,
+             deduplicated by content
+
+Documents are opened with mmap: the record table is a NumPy view onto the
+file, strings and blobs are only decoded when a record asks for them, and
+records are handed out in chunks so large files stream into the editor.
+"""
+import mmap
+import os
+import struct
+
+import numpy as np
+
+EXTENSION = '.vgd'
+MAGIC = b'VGD\0'
+VERSION = 1
+CHUNK_SIZE = 65536
+
+# magic, version, reserved, width, height,
+# record count/offset, string count/offset, blob count/offset
+HEADER = struct.Struct('<4sHHII6Q')
+NONE = 0xFFFFFFFF  # missing string / blob reference
+
+RECORD_DTYPE = np.dtype([
+    ('type', 'u1'), ('reserved', 'V1'),
+    ('font_size', '<u2'),  # points, of a text; 0 for the default size (and in older documents)
+    ('color', '<u4'),    # string index
+    ('payload', '<u4'),  # string index of a text, blob index of an image
+    ('name', '<u4'),     # string index of an image path
+    ('x', '<f8'), ('y', '<f8'), ('width', '<f8'), ('height', '<f8'), ('z', '<f8'),
+])
+TYPES = ('rectangle', 'ellipse', 'line', 'text', 'image')
+TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+
+
+class Table():
+    """Deduplicated list of byte strings, written as an offset table plus data."""
+    def __init__(self):
+        self.items = []
+        self.index = {}
+
+    def add(self, data):
+        i = self.index.get(data)
+        if i is None:
+            i = self.index[data] = len(self.items)
+            self.items.append(data)
+        return i
+
+    def add_string(self, text):
+        if text is None:
+            return NONE
+        return self.add(str(text).encode('utf-8'))
+
+    def write(self, f):
+        offsets = np.zeros(len(self.items) + 1, dtype='<u8')
+        np.cumsum([len(item) for item in self.items], out=offsets[1:])
+        f.write(offsets.tobytes())
+        for item in self.items:
+            f.write(item)
+
+
+def align(f):
+    padding = -f.tell() % 8
+    f.write(b'\0' * padding)
+    return f.tell()
+
+
+def image_bytes(obj, cache):
+    data = getattr(obj, 'image_data', None)
+    if data is not None:
+        return bytes(data)
+    path = obj.image_path
+    if path not in cache:
+        with open(path, 'rb') as f:
+            cache[path] = f.read()
+    return cache[path]
+
+
+def save(path, objects, width=800, height=600, store=None):
+    """Write objects (sharing one SceneStore) to path, replacing it atomically.
+
+    ``store`` overrides where the columns are read from (see journal.FrozenStore).
+    """
+    strings = Table()
+    blobs = Table()
+    records = np.zeros(len(objects), dtype=RECORD_DTYPE)
+    records['payload'] = NONE
+    records['name'] = NONE
+
+    if objects:
+        store = store or objects[0].store
+        rows = store.rows(objects)
+        for name in ('x', 'y', 'width', 'height', 'z', 'font_size'):
+            records[name] = getattr(store, name)[rows]
+        palette = np.array([strings.add_string(color) for color in store.palette], dtype='<u4')
+        records['color'] = palette[store.color[rows]]
+        records['type'] = [TYPE_CODES[obj.type.lower()] for obj in objects]
+
+        # Only texts and images carry variable-length data
+        files = {}
+        for i in np.flatnonzero(records['type'] >= TYPE_CODES['text']):
+            obj = objects[i]
+            if obj.type == 'Text':
+                records['payload'][i] = strings.add_string(obj.text)
+            else:
+                data = image_bytes(obj, files)
+                records['payload'][i] = blobs.add(data)
+                records['name'][i] = strings.add_string(obj.image_path)
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(b'\0' * HEADER.size)
+        records_offset = align(f)
+        f.write(records.tobytes())
+        strings_offset = align(f)
+        strings.write(f)
+        blobs_offset = align(f)
+        blobs.write(f)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, width, height,
+                            len(records), records_offset,
+                            len(strings.items), strings_offset,
+                            len(blobs.items), blobs_offset))
+    os.replace(temp_path, path)
+
+
+class Document():
+    """A memory-mapped .vgd file. Use as a context manager or call close()."""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.read_header()
+        except (ValueError, OSError):
+            self.file.close()
+            raise
+        self.strings = {}  # decoded string cache
+        self.blobs = {}
+
+    def read_header(self):
+        if len(self.map) < HEADER.size:
+            raise ValueError(f"{self.path}: not a document")
+        (magic, version, _, self.width, self.height,
+         count, records_offset, string_count, strings_offset,
+         blob_count, blobs_offset) = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: not a document")
+        if version > VERSION:
+            raise ValueError(f"{self.path}: unsupported document version {version}")
+        self.version = version
+        self.records = np.frombuffer(self.map, dtype=RECORD_DTYPE, count=count, offset=records_offset)
+        self.string_offsets = np.frombuffer(self.map, dtype='<u8', count=string_count + 1, offset=strings_offset)
+        self.strings_data = strings_offset + self.string_offsets.nbytes
+        self.blob_offsets = np.frombuffer(self.map, dtype='<u8', count=blob_count + 1, offset=blobs_offset)
+        self.blobs_data = blobs_offset + self.blob_offsets.nbytes
+
+    def __len__(self):
+        return len(self.records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.records = self.string_offsets = self.blob_offsets = None
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # a caller still holds a chunk view; the map closes with it
+        self.file.close()
+
+    def string(self, i):
+        if i == NONE:
+            return None
+        text = self.strings.get(i)
+        if text is None:
+            start = self.strings_data + int(self.string_offsets[i])
+            end = self.strings_data + int(self.string_offsets[i + 1])
+            text = self.strings[i] = self.map[start:end].decode('utf-8')
+        return text
+
+    def blob(self, i):
+        if i == NONE:
+            return None
+        data = self.blobs.get(i)
+        if data is None:
+            start = self.blobs_data + int(self.blob_offsets[i])
+            end = self.blobs_data + int(self.blob_offsets[i + 1])
+            data = self.blobs[i] = self.map[start:end]
+        return data
+
+    def chunks(self, size=CHUNK_SIZE):
+        for start in range(0, len(self.records), size):
+            yield self.records[start:start + size]
+
+    def decode(self, chunk):
+        """Yield render/factory records (dicts) for a chunk of the record table."""
+        columns = [chunk[name].tolist() for name in ('type', 'x', 'y', 'width', 'height', 'z', 'color', 'payload', 'name', 'font_size')]
+        for type_code, x, y, width, height, z, color, payload, name, font_size in zip(*columns):
+            record = {'type': TYPES[type_code], 'x': x, 'y': y, 'width': width, 'height': height,
+                      'color': self.string(color), 'z': z}
+            if type_code == TYPE_CODES['text']:
+                record['text'] = self.string(payload)
+                if font_size:
+                    record['font_size'] = font_size
+            elif type_code == TYPE_CODES['image']:
+                record['image_path'] = self.string(name)
+                record['image_data'] = self.blob(payload)
+            yield record
+
+    def iter_records(self, chunk_size=CHUNK_SIZE):
+        for chunk in self.chunks(chunk_size):
+            yield from self.decode(chunk)
@@ -0,0 +1,227 @@
+"""Append-only edit journal with snapshots, for autosave and crash recovery.
+
+An autosave directory holds:
+
+    journal.log        JSON lines; the first names the snapshot it extends,
+                       every other line is one edit entry
+    snapshot-<n>.vgd   the scene at generation n, as a .vgd document
+    snapshot-<n>.npy   the store row of each record in that snapshot
+
+Entries are appended by a writer thread that fsyncs in batches, so callers
+only pay for a queue put. Compaction writes a new snapshot, then atomically
+replaces the journal with an empty one naming it; older snapshots are removed
+afterwards, so a crash at any point leaves a journal and the snapshot it
+extends. A torn last line (a crash mid-write) is ignored when reading.
+"""
+import glob
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+
+import document
+
+JOURNAL = 'journal.log'
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.vectorgraphiceditor', 'autosave')
+SYNC_INTERVAL = 0.5  # seconds between fsyncs while entries arrive
+SNAPSHOT = re.compile(r'snapshot-(\d+)\.(vgd|npy)$')
+
+
+def snapshot_paths(directory, generation):
+    base = os.path.join(directory, f"snapshot-{generation}")
+    return base + document.EXTENSION, base + '.npy'
+
+
+def encode(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"cannot journal {type(value).__name__}")
+
+
+class FrozenStore():
+    """Copy of the store columns document.save reads, for objects in the given rows.
+
+    Lets the writer thread save a snapshot while the editor keeps changing the
+    live store. Groups are flattened into the coordinates.
+    """
+    def __init__(self, store, rows):
+        # Geometry as it appears, with group transforms applied
+        self.x, self.y, self.width, self.height = (np.array(column) for column in store.world(rows))
+        self.font_size = np.array(store.world_font_sizes(rows))
+        self.z = store.z[rows]
+        self.color = store.color[rows]
+        self.palette = list(store.palette)
+
+    def rows(self, objects):
+        return np.arange(len(objects))
+
+
+class Recovery():
+    """What a journal left behind: the snapshot it extends and the entries after it."""
+    def __init__(self, snapshot, rows, entries):
+        self.snapshot = snapshot  # .vgd path
+        self.rows = rows  # store row of each snapshot record
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.rows) + len(self.entries)
+
+
+def recover(directory):
+    """Read the journal in directory; None when there is nothing to recover."""
+    try:
+        with open(os.path.join(directory, JOURNAL), 'rb') as f:
+            lines = f.read().split(b'\n')
+    except FileNotFoundError:
+        return None
+    try:
+        header = json.loads(lines[0])
+        snapshot, rows_path = snapshot_paths(directory, header['base'])
+        rows = np.load(rows_path).tolist()
+    except (ValueError, KeyError, OSError):
+        return None  # no complete base: the journal was never started
+    entries = []
+    row_sets = {}
+    for line in lines[1:]:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            break  # torn tail
+        if entry.get('op') == 'rows':
+            row_sets[entry['id']] = entry['rows']
+            continue
+        if isinstance(entry.get('rows'), int):
+            entry['rows'] = row_sets[entry['rows']]
+        entries.append(entry)
+    recovery = Recovery(snapshot, rows, entries)
+    return recovery if len(recovery) else None
+
+
+class Journal():
+    """Background writer of journal entries and snapshots in one directory.
+
+    ``append`` takes an entry dict, or a function returning one that is called
+    on the writer thread. A ``rows`` array shared by consecutive entries (the
+    steps of one drag) is written once and referred to by id.
+    """
+    def __init__(self, directory, sync_interval=SYNC_INTERVAL):
+        self.directory = directory
+        self.sync_interval = sync_interval
+        os.makedirs(directory, exist_ok=True)
+        existing = [int(m.group(1)) for m in map(SNAPSHOT.search, os.listdir(directory)) if m]
+        self.generation = max(existing, default=0)
+        self.file = None
+        self.last_rows = None
+        self.row_set = 0
+        self.queue = queue.SimpleQueue()
+        self.error = None  # first failure of the writer thread; autosave stops there
+        self.thread = threading.Thread(target=self.run, name="journal-writer", daemon=True)
+        self.thread.start()
+
+    def append(self, entry):
+        self.queue.put(('entry', entry))
+
+    def compact(self, objects, store, width, height):
+        """Replace the journal by a snapshot of objects (read from ``store``, a FrozenStore)."""
+        self.queue.put(('compact', (objects, store, width, height)))
+
+    def close(self, discard=False):
+        # Flush everything queued; discard removes the autosave after a clean exit
+        self.queue.put(('close', discard))
+        self.thread.join()
+
+    def run(self):
+        dirty = False
+        last_sync = time.monotonic()
+        while True:
+            timeout = max(0, last_sync + self.sync_interval - time.monotonic()) if dirty else None
+            try:
+                kind, payload = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                kind, payload = 'sync', None
+            if self.error is not None and kind != 'close':
+                continue
+            try:
+                if kind == 'entry':
+                    self.write(payload() if callable(payload) else payload)
+                    dirty = True
+                    continue
+                if dirty and self.file is not None:
+                    self.sync()
+                dirty = False
+                last_sync = time.monotonic()
+                if kind == 'compact':
+                    self.write_snapshot(*payload)
+                elif kind == 'close':
+                    if self.file is not None:
+                        self.file.close()
+                    if payload:
+                        self.remove(self.generation + 1)
+                    return
+            except Exception as e:  # keep draining the queue; the editor checks error
+                self.error = e
+
+    def write(self, entry):
+        if self.file is None:
+            return
+        rows = entry.get('rows')
+        if isinstance(rows, np.ndarray):
+            if rows is not self.last_rows:
+                self.row_set += 1
+                self.last_rows = rows
+                self.file.write(json.dumps({'op': 'rows', 'id': self.row_set, 'rows': rows.tolist()}) + '\n')
+            entry = dict(entry, rows=self.row_set)
+        self.file.write(json.dumps(entry, default=encode) + '\n')
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def write_snapshot(self, objects, store, width, height):
+        generation = self.generation + 1
+        snapshot, rows_path = snapshot_paths(self.directory, generation)
+        document.save(snapshot, objects, width, height, store=store)
+        np.save(rows_path + '.tmp.npy', np.asarray([obj.row for obj in objects], dtype=np.int64))
+        os.replace(rows_path + '.tmp.npy', rows_path)
+
+        # Switch the journal over to the new snapshot in one rename
+        path = os.path.join(self.directory, JOURNAL)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'base': generation}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        if self.file is not None:
+            self.file.close()
+        os.replace(path + '.tmp', path)
+        self.sync_directory()
+        self.file = open(path, 'a', encoding='utf-8')
+        self.last_rows = None
+        self.generation = generation
+        self.remove(generation)
+
+    def sync_directory(self):
+        if hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def remove(self, keep):
+        # Delete snapshots older than generation keep (all of them past the newest), and
+        # the journal itself when nothing is kept
+        for path in glob.glob(os.path.join(self.directory, 'snapshot-*')):
+            match = SNAPSHOT.search(path)
+            if match and int(match.group(1)) < keep:
+                os.remove(path)
+        if keep > self.generation:
+            try:
+                os.remove(os.path.join(self.directory, JOURNAL))
+            except FileNotFoundError:
+                pass
@@ -1,12 +1,32 @@
+import base64
+import bisect
+import gc
+import hashlib
+import io
+import json
 import math
-
+import os
+import queue
+import sys
+import time
+import weakref
+from contextlib import contextmanager
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import tkinter as tk
 from abc import ABC, abstractmethod
 from tkinter import colorchooser
 from tkinter import messagebox
 from tkinter import PhotoImage
 from tkinter import filedialog
-from PIL import Image, ImageTk
+from tkinter import font as tkfont
+
+# Pillow (with renderer, which needs it) and svg are imported where they are
+# first used, so the editor starts without them
+import document
+import journal
 
 
 class GraphicObjectFactory() :
@@ -24,19 +44,301 @@ class GraphicObjectFactory() :
         elif obj_type == 'image':
             return ImageObject(canvas, start_x, start_y, image_path)
 
+    def create_from_record(self, canvas, record):
+        # Records carry width/height directly (see document.py / renderer.py)
+        obj_type = record['type']
+        x, y, color = record['x'], record['y'], record.get('color')
+        if obj_type == 'rectangle':
+            obj = RectangleObject(canvas, x, y, record['width'], record['height'], color)
+        elif obj_type == 'ellipse':
+            obj = EllipseObject(canvas, x, y, record['width'], record['height'], color)
+        elif obj_type == 'line':
+            obj = LineObject(canvas, x, y, record['width'], record['height'], color)
+        elif obj_type == 'text':
+            obj = TextObject(canvas, x, y, record.get('text', ''), color, record.get('font_size'))
+        elif obj_type == 'image':
+            obj = ImageObject(canvas, x, y, record.get('image_path'), image_data=record.get('image_data'))
+        else:
+            return None
+        if obj_type in ('text', 'image') and (record.get('width') or record.get('height')):
+            # Texts and images take their extent from their content unless it was resized
+            obj.width, obj.height = record['width'], record['height']
+        obj.set_z_order(record.get('z', 0))
+        return obj
+
+
+class SceneStore():
+    """Columnar storage for the geometry, z-order and color of every object on a canvas.
+
+    Objects are thin handles holding a row number; bulk edits over a selection
+    are single NumPy operations on the row arrays.
+    """
+    stores = weakref.WeakKeyDictionary()  # canvas -> SceneStore
+
+    @classmethod
+    def of(cls, canvas):
+        store = cls.stores.get(canvas)
+        if store is None:
+            store = cls.stores[canvas] = cls()
+        return store
+
+    @classmethod
+    def reset(cls, canvas):
+        view = cls.of(canvas).view
+        store = cls.stores[canvas] = cls()
+        store.view = view
+        view.shown = ZIndex()
+        return store
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.width = np.zeros(capacity)
+        self.height = np.zeros(capacity)
+        self.pad_x = np.zeros(capacity)  # half extents around x/y, for objects anchored at their center (text)
+        self.pad_y = np.zeros(capacity)
+        self.font_size = np.zeros(capacity, dtype=np.int32)  # points, for objects with text; 0 otherwise
+        self.z = np.zeros(capacity)
+        self.color = np.zeros(capacity, dtype=np.int32)  # index into self.palette
+        self.group = np.zeros(capacity, dtype=np.int32)  # id of the enclosing Group, 0 for none
+        self.palette = []
+        self.palette_index = {}
+        # Composed world transform of every group by id (world = local * scale + offset); id 0 is the identity
+        self.groups = [None]
+        self.group_tx = np.zeros(16)
+        self.group_ty = np.zeros(16)
+        self.group_sx = np.ones(16)
+        self.group_sy = np.ones(16)
+        self.order = ZIndex()  # objects registered with the editor, by z
+        self.view = Viewport()
+
+    def columns(self):
+        return ('x', 'y', 'width', 'height', 'pad_x', 'pad_y', 'font_size', 'z', 'color', 'group')
+
+    def allocate(self, x, y, width, height, color):
+        if self.size == len(self.x):
+            for name in self.columns():
+                column = getattr(self, name)
+                grown = np.zeros(len(column) * 2, dtype=column.dtype)
+                grown[:self.size] = column
+                setattr(self, name, grown)
+        row = self.size
+        self.size += 1
+        self.x[row] = x
+        self.y[row] = y
+        self.width[row] = width
+        self.height[row] = height
+        self.pad_x[row] = 0
+        self.pad_y[row] = 0
+        self.font_size[row] = 0
+        self.z[row] = 0
+        self.color[row] = self.color_code(color)
+        self.group[row] = 0
+        return row
+
+    def add_group(self, group):
+        if len(self.groups) == len(self.group_tx):
+            for name, fill in (('group_tx', 0), ('group_ty', 0), ('group_sx', 1), ('group_sy', 1)):
+                column = getattr(self, name)
+                grown = np.full(len(column) * 2, fill, dtype=column.dtype)
+                grown[:len(column)] = column
+                setattr(self, name, grown)
+        self.groups.append(group)
+        return len(self.groups) - 1
+
+    def color_code(self, color):
+        code = self.palette_index.get(color)
+        if code is None:
+            code = self.palette_index[color] = len(self.palette)
+            self.palette.append(color)
+        return code
+
+    def color_of(self, row):
+        return self.palette[self.color[row]]
+
+    def rows(self, objects):
+        return np.fromiter((obj.row for obj in objects), dtype=np.intp, count=len(objects))
+
+    ## Bulk operations over a selection of rows
+    def move_to(self, rows, x, y):
+        self.x[rows] = x
+        self.y[rows] = y
+
+    def move_by(self, rows, dx, dy):
+        self.x[rows] += dx
+        self.y[rows] += dy
+
+    def resize(self, rows, width, height):
+        self.width[rows] = width
+        self.height[rows] = height
+
+    def set_z(self, rows, z):
+        self.z[rows] = z
+
+    def set_color(self, rows, color):
+        self.color[rows] = self.color_code(color)
+
+    def world(self, rows):
+        # x, y, width and height with the transforms of enclosing groups applied
+        x, y, width, height = self.x[rows], self.y[rows], self.width[rows], self.height[rows]
+        if len(self.groups) == 1:
+            return x, y, width, height
+        g = self.group[rows]
+        sx, sy = self.group_sx[g], self.group_sy[g]
+        return x * sx + self.group_tx[g], y * sy + self.group_ty[g], width * sx, height * sy
+
+    def world_font_sizes(self, rows):
+        # Font sizes as drawn: text scales with the vertical scale of its groups
+        size = self.font_size[rows]
+        if len(self.groups) == 1:
+            return size
+        scaled = np.maximum(1, np.rint(size * self.group_sy[self.group[rows]])).astype(size.dtype)
+        return np.where(size > 0, scaled, 0)
+
+    def centers(self, rows):
+        x, y, width, height = self.world(rows)
+        return x + width * 0.5, y + height * 0.5
+
+    def local_bboxes(self, rows):
+        # Bounding boxes in the frame of each row's group
+        x, y = self.x[rows], self.y[rows]
+        x2, y2 = x + self.width[rows], y + self.height[rows]
+        pad_x, pad_y = self.pad_x[rows], self.pad_y[rows]
+        return (np.minimum(x, x2) - pad_x, np.minimum(y, y2) - pad_y,
+                np.maximum(x, x2) + pad_x, np.maximum(y, y2) + pad_y)
+
+    def bboxes(self, rows):
+        x0, y0, x1, y1 = self.local_bboxes(rows)
+        if len(self.groups) == 1:
+            return x0, y0, x1, y1
+        g = self.group[rows]
+        sx, sy, tx, ty = self.group_sx[g], self.group_sy[g], self.group_tx[g], self.group_ty[g]
+        return x0 * sx + tx, y0 * sy + ty, x1 * sx + tx, y1 * sy + ty
+
+    def bbox(self, rows):
+        x0, y0, x1, y1 = self.bboxes(rows)
+        return float(x0.min()), float(y0.min()), float(x1.max()), float(y1.max())
+
+
+class Viewport():
+    """Zoom level and culling region of a canvas.
+
+    ``rect`` is the visible world rectangle grown by a margin; objects outside
+    it have no canvas item. ``None`` means no culling (everything is drawn).
+    Text and images smaller than ``stand_in_size`` screen pixels are drawn as
+    plain boxes instead. While an editor transaction is open, ``pending`` maps
+    objects to the canvas changes they still owe (DRAW, COORDS, STYLE, RESTACK).
+    """
+    DRAW, COORDS, STYLE, RESTACK = 1, 2, 4, 8
+
+    def __init__(self):
+        self.scale = 1.0  # canvas pixels per world unit
+        self.rect = None
+        self.margin = 0.5  # fraction of the visible size kept alive around it
+        self.stand_in_size = 6
+        self.overview = False  # zoomed out too far for per-object items
+        self.shown = ZIndex()  # objects with a canvas item, in stacking order
+        self.pending = None  # object -> owed changes, inside a transaction
+
+    def contains(self, bbox):
+        if self.overview:
+            return False
+        if self.rect is None:
+            return True
+        x0, y0, x1, y1 = bbox
+        return x1 >= self.rect[0] and x0 <= self.rect[2] and y1 >= self.rect[1] and y0 <= self.rect[3]
+
+    def contains_many(self, x0, y0, x1, y1):
+        if self.overview:
+            return np.zeros(len(x0), dtype=bool)
+        if self.rect is None:
+            return np.ones(len(x0), dtype=bool)
+        r = self.rect
+        return (x1 >= r[0]) & (x0 <= r[2]) & (y1 >= r[1]) & (y0 <= r[3])
+
+    def to_view(self, *coords):
+        scale = self.scale
+        return tuple(c * scale for c in coords)
+
+    def defer(self, obj, change):
+        # Inside a transaction, remember the change instead of touching the canvas
+        if self.pending is None:
+            return False
+        self.pending[obj] = self.pending.get(obj, 0) | change
+        return True
+
+    def place(self, obj):
+        # Stack the item of a shown object directly above the shown object below it
+        below = self.shown.below(obj)
+        if below is None:
+            obj.canvas.tag_lower(obj.item_id)
+        else:
+            obj.canvas.tag_raise(obj.item_id, below.item_id)
+
 
 class GraphicObject(ABC):
     object_count = 0 # Class-level counter for generating unique names
+    __slots__ = ('canvas', 'store', 'row', 'id', 'spatial_index', 'item_id', 'stand_in')
+    has_stand_in = False # whether tiny instances are drawn as a plain box
     
     def __init__(self, canvas, x, y, width, height, color):
         self.canvas = canvas
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.color = color
-        self.z = 0 # z-order 
+        self.store = SceneStore.of(canvas)
+        self.row = self.store.allocate(x, y, width, height, color)
         self.id = self.generate_obj_id()
+        self.spatial_index = None # set by the editor once the object is registered
+        self.item_id = None # canvas item, created once and then updated in place
+        self.stand_in = False # whether the item is the cheap box stand-in
+
+    # Attributes live in the scene store columns
+    @property
+    def x(self):
+        return float(self.store.x[self.row])
+
+    @x.setter
+    def x(self, value):
+        self.store.x[self.row] = value
+
+    @property
+    def y(self):
+        return float(self.store.y[self.row])
+
+    @y.setter
+    def y(self, value):
+        self.store.y[self.row] = value
+
+    @property
+    def width(self):
+        return float(self.store.width[self.row])
+
+    @width.setter
+    def width(self, value):
+        self.store.width[self.row] = value
+
+    @property
+    def height(self):
+        return float(self.store.height[self.row])
+
+    @height.setter
+    def height(self, value):
+        self.store.height[self.row] = value
+
+    @property
+    def z(self):
+        return float(self.store.z[self.row])
+
+    @z.setter
+    def z(self, value):
+        self.store.z[self.row] = value
+
+    @property
+    def color(self):
+        return self.store.color_of(self.row)
+
+    @color.setter
+    def color(self, value):
+        self.store.color[self.row] = self.store.color_code(value)
 
     @classmethod
     def generate_obj_id(cls):
@@ -44,9 +346,87 @@ class GraphicObject(ABC):
         return f"{cls.__name__}{cls.object_count:03d}"
 
     @abstractmethod
-    def draw(self):
+    def create_item(self):
+        pass
+
+    @abstractmethod
+    def item_coords(self):
         pass
 
+    @abstractmethod
+    def item_style(self):
+        pass
+
+    def draw(self):
+        view = self.store.view
+        if view.defer(self, view.DRAW):
+            return
+        if not view.contains(self.get_obj_bbox()):
+            self.hide()
+            return
+        stand_in = self.wants_stand_in()
+        if self.item_id is not None and stand_in != self.stand_in:
+            self.hide()
+        if self.item_id is None:
+            self.stand_in = stand_in
+            if stand_in:
+                self.item_id = self.canvas.create_rectangle(*self.current_coords(), outline='', tags="graphic_object", **self.current_style())
+            else:
+                self.item_id = self.create_item()
+            # New items start on top; only those with something above them move
+            view.shown.add(self)
+            if view.shown.above(self) is not None:
+                view.place(self)
+        else:
+            self.canvas.coords(self.item_id, *self.current_coords())
+            self.canvas.itemconfig(self.item_id, **self.current_style())
+
+    def hide(self):
+        if self.item_id is not None:
+            self.canvas.delete(self.item_id)
+            self.item_id = None
+            self.store.view.shown.discard(self)
+
+    def update_coords(self):
+        if self.store.view.defer(self, Viewport.COORDS):
+            return
+        if self.item_id is None or self.stand_in != self.wants_stand_in() or not self.store.view.contains(self.get_obj_bbox()):
+            self.draw()
+        else:
+            self.canvas.coords(self.item_id, *self.current_coords())
+
+    def update_style(self):
+        if self.store.view.defer(self, Viewport.STYLE):
+            return
+        if self.item_id is None:
+            self.draw()
+        else:
+            self.canvas.itemconfig(self.item_id, **self.current_style())
+
+    ## Level of detail
+    def screen_size(self):
+        _, _, w, h = self.world_geometry()
+        return max(abs(w), abs(h)) * self.store.view.scale
+
+    def wants_stand_in(self):
+        return self.has_stand_in and self.screen_size() < self.store.view.stand_in_size
+
+    def stand_in_bbox(self):
+        return self.get_obj_bbox()
+
+    def stand_in_color(self):
+        return self.color
+
+    def current_coords(self):
+        if self.stand_in:
+            return self.store.view.to_view(*self.stand_in_bbox())
+        return self.item_coords()
+
+    def current_style(self):
+        if self.stand_in:
+            return {'fill': self.stand_in_color()}
+        return self.item_style()
+
     def get_obj_pos(self):
         return getattr(self, 'x', 0), getattr(self, 'y', 0)
     
@@ -57,100 +437,2067 @@ class GraphicObject(ABC):
         return getattr(self, 'color', 0)
     
     def get_obj_center(self):
-        c_x = getattr(self,'x',0) + getattr(self,'width',0)*0.5
-        c_y = getattr(self,'y', 0) + getattr(self,'height',0)*0.5
-        return c_x,c_y
+        x, y, w, h = self.world_geometry()
+        return x + w * 0.5, y + h * 0.5
     
+    def distance_to(self, x, y):
+        # Hit-test distance from a point, used by find_closest
+        c_x, c_y = self.get_obj_center()
+        return math.sqrt((x - c_x)**2 + (y - c_y)**2)
+
     def get_obj_z(self):
         z = getattr(self, 'z', 0)
         return z
+
+    def get_obj_bbox(self):
+        x, y, w, h = self.world_geometry()
+        return min(x, x + w), min(y, y + h), max(x, x + w), max(y, y + h)
+
+    @property
+    def group(self):
+        gid = self.store.group[self.row]
+        return self.store.groups[gid] if gid else None
+
+    def world_scale(self):
+        gid = self.store.group[self.row]
+        if not gid:
+            return 1.0, 1.0
+        return float(self.store.group_sx[gid]), float(self.store.group_sy[gid])
+
+    def world_geometry(self):
+        # x, y, width, height with the transforms of enclosing groups applied
+        store, row = self.store, self.row
+        x, y, w, h = float(store.x[row]), float(store.y[row]), float(store.width[row]), float(store.height[row])
+        gid = store.group[row]
+        if gid:
+            sx, sy = float(store.group_sx[gid]), float(store.group_sy[gid])
+            x, y, w, h = x * sx + float(store.group_tx[gid]), y * sy + float(store.group_ty[gid]), w * sx, h * sy
+        return x, y, w, h
+
+    def geometry_changed(self):
+        if self.spatial_index is not None:
+            self.spatial_index.update(self)
     
     def set_obj_pos(self, x, y):
         self.x = x
         self.y = y
-        self.draw()
+        self.update_coords()
+        self.geometry_changed()
     
     def set_obj_color(self, color):
         self.color = color
-        self.draw()
+        self.update_style()
     
     def set_obj_size(self, w,h):
         self.width = w
         self.height = h
-        self.draw()
+        self.update_coords()
+        self.geometry_changed()
     
     def set_z_order(self, z):
         self.z = z
-        self.draw()
+        self.order_changed()
+
+    def order_changed(self):
+        # Refile under the current z and move only this object's canvas item
+        self.store.order.update(self)
+        view = self.store.view
+        if view.defer(self, view.RESTACK):
+            return
+        if self.item_id is not None and view.shown.update(self):
+            view.place(self)
 
 
 class RectangleObject(GraphicObject):
+    type = 'Rectangle'
+    __slots__ = ()
+
     def __init__(self, canvas, x, y, width, height, color):
         super().__init__(canvas,x,y,width,height,color)
-        self.type = 'Rectangle'
-        self.rect_id = None
         self.draw()
 
-    def draw(self):
-        if self.rect_id is not None:
-            self.canvas.delete(self.rect_id)
-        self.rect_id = self.canvas.create_rectangle(self.x, self.y, self.x + self.width, self.y + self.height, fill=self.color, outline=self.color, tags="graphic_object")
+    def create_item(self):
+        return self.canvas.create_rectangle(*self.item_coords(), tags="graphic_object", **self.item_style())
+
+    def item_coords(self):
+        x, y, w, h = self.world_geometry()
+        return self.store.view.to_view(x, y, x + w, y + h)
+
+    def item_style(self):
+        return {'fill': self.color, 'outline': self.color}
 
 class EllipseObject(GraphicObject):
+    type = 'Ellipse'
+    __slots__ = ()
+
     def __init__(self, canvas, x, y, width, height, color):
         super().__init__(canvas,x,y,width,height,color)
-        self.type = 'Ellipse'
-        self.rect_id = None
         self.draw()
 
-    def draw(self):
-        if self.rect_id is not None:
-            self.canvas.delete(self.rect_id)
-        self.rect_id = self.canvas.create_oval(self.x, self.y, self.x + self.width, self.y + self.height, fill=self.color, outline=self.color, tags="graphic_object")
+    def create_item(self):
+        return self.canvas.create_oval(*self.item_coords(), tags="graphic_object", **self.item_style())
+
+    def item_coords(self):
+        x, y, w, h = self.world_geometry()
+        return self.store.view.to_view(x, y, x + w, y + h)
+
+    def item_style(self):
+        return {'fill': self.color, 'outline': self.color}
 
 class LineObject(GraphicObject):
+    type = 'Line'
+    __slots__ = ()
+
     def __init__(self, canvas, x, y, width, height, color):
         super().__init__(canvas,x,y,width,height,color)
-        self.type = 'Line'
-        self.rect_id = None
         self.draw()
 
-    def draw(self):
-        if self.rect_id is not None:
-            self.canvas.delete(self.rect_id)
-        self.rect_id = self.canvas.create_line(self.x, self.y, self.x + self.width, self.y + self.height, fill=self.color, width=5, tags="graphic_object")
+    def create_item(self):
+        return self.canvas.create_line(*self.item_coords(), tags="graphic_object", **self.item_style())
+
+    def item_coords(self):
+        x, y, w, h = self.world_geometry()
+        return self.store.view.to_view(x, y, x + w, y + h)
+
+    def item_style(self):
+        return {'fill': self.color, 'width': max(1, 5 * self.store.view.scale)}
+
+class TextLayoutCache():
+    """Measured extents of text labels, keyed by (text, font family, size).
+
+    Measuring a string is a round trip into Tk, so every distinct label is
+    measured once and kept in a least recently used table of ``capacity``
+    entries. Many labels share few fonts, so Font objects are kept too.
+    """
+    def __init__(self, capacity=16384):
+        self.capacity = capacity
+        self.entries = OrderedDict()  # (text, family, size) -> (width, height), oldest first
+        self.fonts = {}  # (family, size) -> Font
+        self.font_type = tkfont.Font  # replaceable when running without a display
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, family, size):
+        font = self.fonts.get((family, size))
+        if font is None:
+            font = self.fonts[(family, size)] = self.font_type(family=family, size=size)
+        return font
+
+    def extent(self, text, family, size):
+        """Width and height in pixels of text as Tk lays it out (one line per newline)."""
+        key = (text, family, size)
+        extent = self.entries.get(key)
+        if extent is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return extent
+        self.misses += 1
+        font = self.font(family, size)
+        lines = text.split('\n')
+        extent = (max(font.measure(line) for line in lines), font.metrics('linespace') * len(lines))
+        self.entries[key] = extent
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return extent
+
+text_layouts = TextLayoutCache()
+
 
 class TextObject(GraphicObject):
-    def __init__(self, canvas, x, y, text, color):
-        super().__init__(canvas, x, y, 0, 0, color)  # Width and height are set to 0 initially
-        self.type = 'Text'
+    type = 'Text'
+    __slots__ = ('text',)
+    has_stand_in = True
+    font_family = "Arial"
+    default_font_size = 12 # points
+    line_height = 16 # pixels at scale 1 and the default size
+
+    def __init__(self, canvas, x, y, text, color, font_size=None):
+        super().__init__(canvas, x, y, 0, 0, color)  # x, y is the center; the extent comes from the layout cache
         self.text = text
-        self.text_id = None
+        self.store.font_size[self.row] = font_size or self.default_font_size
+        self.measure()
         self.draw()
 
-    def draw(self):
-        if self.text_id is not None:
-            self.canvas.delete(self.text_id)
-        self.text_id = self.canvas.create_text(self.x, self.y, text=self.text, fill=self.color, font=("Arial", 12), tags="graphic_object")
+    @property
+    def font_size(self):
+        return int(self.store.font_size[self.row])
+
+    def measure(self):
+        width, height = text_layouts.extent(self.text, self.font_family, self.font_size)
+        self.store.pad_x[self.row] = width * 0.5
+        self.store.pad_y[self.row] = height * 0.5
+
+    def create_item(self):
+        return self.canvas.create_text(*self.item_coords(), tags="graphic_object", **self.item_style())
+
+    def item_coords(self):
+        x, y, _, _ = self.world_geometry()
+        return self.store.view.to_view(x, y)
+
+    def item_style(self):
+        # Scaled groups scale their labels too
+        size = max(1, round(self.font_size * self.store.view.scale * self.world_scale()[1]))
+        return {'text': self.text, 'fill': self.color, 'font': (self.font_family, size)}
+
+    def screen_size(self):
+        return self.line_height * self.font_size / self.default_font_size * self.store.view.scale * self.world_scale()[1]
+
+    def world_font_size(self):
+        # The size baked in when the enclosing groups are flattened
+        return max(1, round(self.font_size * self.world_scale()[1]))
+
+    def get_obj_bbox(self):
+        x0, y0, x1, y1 = super().get_obj_bbox()
+        sx, sy = self.world_scale()
+        pad_x, pad_y = self.store.pad_x[self.row] * sx, self.store.pad_y[self.row] * sy
+        return float(x0 - pad_x), float(y0 - pad_y), float(x1 + pad_x), float(y1 + pad_y)
+
+    def distance_to(self, x, y):
+        # Anywhere on the label is a direct hit
+        x0, y0, x1, y1 = self.get_obj_bbox()
+        return math.hypot(max(x0 - x, 0, x - x1), max(y0 - y, 0, y - y1))
+
+
+class ImageCache():
+    """Content-addressed cache of decoded images shared by all ImageObjects.
+
+    Images are keyed by the SHA-1 of their encoded bytes, so the same picture
+    inserted many times is decoded once. Each image has mip levels (level n is
+    downscaled by 2**n) for small on-screen sizes, and a PhotoImage per level.
+    The cache keeps recently used entries within ``budget`` bytes; evicted
+    entries stay shared for as long as some object still displays them.
+    The source of an image (its path, or the encoded bytes an object embeds)
+    is kept while objects in a scene use it: the editor retains and releases
+    image objects as they enter and leave the scene.
+    """
+    def __init__(self, budget=256 * 2**20):
+        self.budget = budget
+        self.used = 0
+        self.entries = OrderedDict()  # (kind, digest, level) -> (value, nbytes), oldest first
+        self.alive = weakref.WeakValueDictionary()  # every value still referenced anywhere
+        self.sources = {}  # digest -> path or encoded bytes
+        self.digests = {}  # (path, mtime, size) -> digest
+        self.file_keys = {}  # digest -> the file keys naming it
+        self.users = Counter()  # digest -> image objects in scenes
+        self.photo_type = None  # ImageTk.PhotoImage once needed; replaceable when running without a display
+
+    @staticmethod
+    def file_key(path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def key(self, path=None, data=None):
+        if data is None:
+            file_key = self.file_key(path)
+            digest = self.digests.get(file_key)
+            if digest is None:
+                with open(path, 'rb') as f:
+                    digest = self.digests[file_key] = hashlib.sha1(f.read()).hexdigest()
+                self.file_keys.setdefault(digest, set()).add(file_key)
+            self.sources.setdefault(digest, path)
+        else:
+            digest = hashlib.sha1(data).hexdigest()
+            self.sources.setdefault(digest, data)
+        return digest
+
+    def retain(self, obj):
+        # obj entered a scene; placeholders are retained once their file is decoded
+        digest = obj.image_key
+        if digest is None:
+            return
+        self.sources.setdefault(digest, obj.image_path if obj.image_data is None else obj.image_data)
+        self.users[digest] += 1
+
+    def release(self, obj):
+        # obj left its scene; the last one out drops the source (the object keeps its own)
+        digest = obj.image_key
+        if digest is None or not self.users[digest]:
+            return
+        self.users[digest] -= 1
+        if not self.users[digest]:
+            del self.users[digest]
+            self.sources.pop(digest, None)
+            for file_key in self.file_keys.pop(digest, ()):
+                self.digests.pop(file_key, None)
+
+    def lookup(self, key, make):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry[0]
+        value = self.alive.get(key)
+        if value is None:
+            value = make()
+            self.alive[key] = value
+        if key[0] == 'image':
+            nbytes = value.width * value.height * len(value.getbands())
+        else:
+            nbytes = value.width() * value.height() * 4
+        self.entries[key] = (value, nbytes)
+        self.used += nbytes
+        self.evict()
+        return value
+
+    def evict(self):
+        while self.used > self.budget and len(self.entries) > 1:
+            _, (value, nbytes) = self.entries.popitem(last=False)
+            self.used -= nbytes
+
+    def add_decoded(self, path, file_key, digest, levels):
+        # Mip levels of a file decoded off the Tk thread (see ImageLoader)
+        self.digests[file_key] = digest
+        self.file_keys.setdefault(digest, set()).add(file_key)
+        self.sources.setdefault(digest, path)
+        for level, image in enumerate(levels):
+            self.lookup(('image', digest, level), lambda: image)
+
+    def decode(self, digest):
+        from PIL import Image
+        source = self.sources[digest]
+        image = Image.open(source if isinstance(source, str) else io.BytesIO(source))
+        image.load()
+        return image
+
+    def image(self, digest, level=0):
+        if level == 0:
+            return self.lookup(('image', digest, 0), lambda: self.decode(digest))
+        return self.lookup(('image', digest, level), lambda: self.image(digest, level - 1).reduce(2))
+
+    def make_photo(self, image):
+        if self.photo_type is None:
+            from PIL import ImageTk
+            self.photo_type = ImageTk.PhotoImage
+        return self.photo_type(image)
+
+    def photo(self, digest, level=0):
+        return self.lookup(('photo', digest, level), lambda: self.make_photo(self.image(digest, level)))
+
+    def scaled_photo(self, digest, width, height):
+        # PhotoImage at an on-screen size, resampled from the nearest larger mip level
+        full_width, full_height = self.size(digest)
+        width, height = max(1, round(width)), max(1, round(height))
+        if (width, height) == (full_width, full_height):
+            return self.photo(digest)
+        level = self.level_for(full_width, full_height, width, height)
+        base = self.image(digest, level)
+        if base.size == (width, height):
+            return self.photo(digest, level)
+        return self.lookup(('photo', digest, (width, height)), lambda: self.make_photo(base.resize((width, height))))
+
+    def size(self, digest):
+        return self.image(digest).size
+
+    @staticmethod
+    def level_for(width, height, target_width, target_height):
+        # Coarsest level that is still at least as large as the target size
+        level = 0
+        while width >= 2 * max(target_width, 1) and height >= 2 * max(target_height, 1):
+            width, height = width // 2, height // 2
+            level += 1
+        return level
+
+
+image_cache = ImageCache()
+
+
+def decode_image_file(path, min_size=64):
+    """Read, hash and decode an image file with its mip levels; safe off the Tk thread."""
+    from PIL import Image
+    file_key = ImageCache.file_key(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with Image.open(path) as source:
+        image = source.copy() if source.mode in ('1', 'L', 'P', 'RGB', 'RGBA') else source.convert('RGBA')
+    levels = [image]
+    while min(levels[-1].size) >= 2 * min_size:
+        levels.append(levels[-1].reduce(2))
+    return file_key, hashlib.sha1(data).hexdigest(), levels
+
+
+class ImageLoader():
+    """Decodes image files on a thread pool for placeholder ImageObjects.
+
+    Workers only read and decode; finished files are queued and picked up by
+    a root.after poll on the Tk thread, which fills the image cache and hands
+    them to ``deliver(path, digest, error)``. Each poll stops after
+    ``slice_ms`` so a large import never holds up the event loop for long.
+    """
+    poll_ms = 15
+    slice_ms = 10
+
+    def __init__(self, root, deliver, workers=None):
+        self.root = root
+        self.deliver = deliver
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.executor = None
+        self.finished = queue.SimpleQueue()  # (path, future), filled by the workers
+        self.outstanding = set()  # paths being decoded
+        self.poll_id = None
+
+    def load(self, path):
+        if path in self.outstanding:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-decode")
+        self.outstanding.add(path)
+        future = self.executor.submit(decode_image_file, path)
+        future.add_done_callback(lambda future: self.finished.put((path, future)))
+        if self.poll_id is None:
+            self.poll_id = self.root.after(self.poll_ms, self.poll)
+
+    def poll(self):
+        self.poll_id = None
+        deadline = time.perf_counter() + self.slice_ms / 1000
+        while time.perf_counter() < deadline:
+            try:
+                path, future = self.finished.get_nowait()
+            except queue.Empty:
+                break
+            self.outstanding.discard(path)
+            error = future.exception()
+            if error is None:
+                file_key, digest, levels = future.result()
+                image_cache.add_decoded(path, file_key, digest, levels)
+                self.deliver(path, digest, None)
+            else:
+                self.deliver(path, None, error)
+        if self.outstanding or not self.finished.empty():
+            self.poll_id = self.root.after(self.poll_ms, self.poll)
+
+    def close(self):
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.outstanding.clear()
 
 
 class ImageObject(GraphicObject):
-    def __init__(self, canvas, x, y, image_path):
-        self.type = 'Image'
+    type = 'Image'
+    __slots__ = ('image_path', 'image_data', 'image_key', 'image')
+    has_stand_in = True
+
+    def __init__(self, canvas, x, y, image_path, image_data=None, size=None):
         self.image_path = image_path
-        self.pil_image = Image.open(image_path)  # Use Pillow to open the image
-        width, height = self.pil_image.size
+        self.image_data = image_data  # encoded file bytes when loaded from a document
+        if size is None:
+            self.image_key = image_cache.key(image_path, image_data)  # Decoded once per distinct image
+            width, height = image_cache.size(self.image_key)
+        else:
+            # Placeholder box of the given size until ImageLoader has decoded the file
+            self.image_key = None
+            width, height = size
 
         super().__init__(canvas, x, y, width, height, 'black')
 
-        self.image = ImageTk.PhotoImage(self.pil_image)  # Convert to a format Tkinter can use
-        self.image_id = None
+        self.image = None  # Shared PhotoImage Tkinter can use, at the current zoom
         self.draw()
 
-    def draw(self):
-        if self.image_id is not None:
-            self.canvas.delete(self.image_id)
-        self.image_id = self.canvas.create_image(self.x, self.y, image=self.image, anchor='nw', tags="graphic_object")
+    @property
+    def pil_image(self):
+        if self.image_key is None:
+            self.image_key = image_cache.key(self.image_path, self.image_data)
+        return image_cache.image(self.image_key)
+
+    def wants_stand_in(self):
+        return self.image_key is None or super().wants_stand_in()
+
+    def create_item(self):
+        return self.canvas.create_image(*self.item_coords(), anchor='nw', tags="graphic_object", **self.item_style())
+
+    def item_coords(self):
+        x, y, _, _ = self.world_geometry()
+        return self.store.view.to_view(x, y)
+
+    def item_style(self):
+        # Images are shown at their natural size, zoomed with the view and scaled with their groups
+        width, height = image_cache.size(self.image_key)
+        sx, sy = self.world_scale()
+        scale = self.store.view.scale
+        self.image = image_cache.scaled_photo(self.image_key, width * scale * sx, height * scale * sy)
+        return {'image': self.image}
+
+    def stand_in_color(self):
+        return 'gray70'
+
+class Symbol():
+    """A reusable shape definition shared by lightweight instances.
+
+    The symbol holds what every copy has in common: the kind of shape, its
+    base size and color, and its text or image. An instance is an ordinary
+    scene object whose store row holds only its transform (position, and size
+    as a scale of the base size) and its color. Text, image bytes, decoded
+    images and text layouts are reached through the symbol, so they exist once
+    however many instances there are. An instance whose color equals the
+    symbol's follows the symbol when it is recolored; any other color is an
+    override.
+    """
+    count = 0
+
+    def __init__(self, kind, width, height, color, text=None, font_size=None, image_path=None, image_data=None, image_key=None):
+        Symbol.count += 1
+        self.name = f"Symbol{Symbol.count:03d}"
+        self.kind = kind
+        self.width = width
+        self.height = height
+        self.color = color
+        self.text = text
+        self.font_size = font_size
+        self.image_path = image_path
+        self.image_data = image_data
+        self.image_key = image_key
+        self.instances = set()  # instances on the scene; add_object and remove_objects keep it
+
+    @classmethod
+    def from_object(cls, obj):
+        kind = obj.type.lower()
+        if kind == 'image':
+            key = obj.image_key or image_cache.key(obj.image_path, obj.image_data)
+            width, height = image_cache.size(key)
+            return cls(kind, width, height, obj.color, image_path=obj.image_path, image_data=obj.image_data, image_key=key)
+        return cls(kind, obj.width, obj.height, obj.color, text=getattr(obj, 'text', None), font_size=getattr(obj, 'font_size', None))
+
+    def instantiate(self, canvas, x, y, width=None, height=None, color=None):
+        return instance_types[self.kind](canvas, self, x, y, width, height, color)
+
+    def redefine(self, **attrs):
+        for name, value in attrs.items():
+            setattr(self, name, value)
+
+
+class SymbolInstance():
+    """Mixin turning a shape class into an instance of a Symbol.
+
+    The shape's own constructor is skipped: the row is filled from the
+    symbol, and shared data is read from it through properties.
+    """
+    __slots__ = ()
+
+    def __init__(self, canvas, symbol, x, y, width=None, height=None, color=None):
+        GraphicObject.__init__(self, canvas, x, y,
+                               symbol.width if width is None else width,
+                               symbol.height if height is None else height,
+                               symbol.color if color is None else color)
+        self.symbol = symbol
+        self.init_shared()
+        self.draw()
+
+    def init_shared(self):
+        pass
+
+class RectangleInstance(SymbolInstance, RectangleObject):
+    __slots__ = ('symbol',)
+
+class EllipseInstance(SymbolInstance, EllipseObject):
+    __slots__ = ('symbol',)
+
+class LineInstance(SymbolInstance, LineObject):
+    __slots__ = ('symbol',)
+
+class TextInstance(SymbolInstance, TextObject):
+    __slots__ = ('symbol',)
+
+    @property
+    def text(self):
+        return self.symbol.text
+
+    def init_shared(self):
+        self.store.font_size[self.row] = self.symbol.font_size or self.default_font_size
+        self.measure()
+
+class ImageInstance(SymbolInstance, ImageObject):
+    __slots__ = ('symbol',)
+
+    @property
+    def image_path(self):
+        return self.symbol.image_path
+
+    @property
+    def image_data(self):
+        return self.symbol.image_data
+
+    @property
+    def image_key(self):
+        return self.symbol.image_key
+
+    def init_shared(self):
+        self.image = None
+
+    def item_style(self):
+        # Shown at the instance size; instances of one size share a PhotoImage
+        _, _, width, height = self.world_geometry()
+        scale = self.store.view.scale
+        self.image = image_cache.scaled_photo(self.image_key, abs(width) * scale, abs(height) * scale)
+        return {'image': self.image}
+
+instance_types = {'rectangle': RectangleInstance, 'ellipse': EllipseInstance, 'line': LineInstance,
+                  'text': TextInstance, 'image': ImageInstance}
+
+
+def box_distance(box, x, y):
+    x0, y0, x1, y1 = box
+    return math.hypot(max(x0 - x, 0, x - x1), max(y0 - y, 0, y - y1))
+
+
+class Group():
+    """A scene-graph node: objects and nested groups under one transform.
+
+    Children keep their coordinates in the group's frame, which maps onto the
+    parent's frame by scale then offset (x * sx + tx); scales stay positive.
+    Moving or resizing a group only changes that transform and the composed
+    world transforms of its nested groups in the store, never the children's
+    columns. The children's bounds in the group's own frame are cached and
+    dropped lazily when a child changes, so the world bounds of a moved group
+    are one transform away, and hit testing skips subtrees whose bounds are
+    farther than the best hit so far.
+    """
+    type = 'Group'
+
+    def __init__(self, store, children):
+        self.store = store
+        self.children = list(children)
+        self.parent = None
+        self.tx, self.ty, self.sx, self.sy = 0.0, 0.0, 1.0, 1.0
+        self.id = store.add_group(self)
+        self.content = None  # children's bounds in this group's frame, while valid
+        self.leaf_list = None  # all objects below this group, while valid
+        self.leaf_rows = None
+
+    def objects(self):
+        return [child for child in self.children if not isinstance(child, Group)]
+
+    def subgroups(self):
+        return [child for child in self.children if isinstance(child, Group)]
+
+    def root(self):
+        group = self
+        while group.parent is not None:
+            group = group.parent
+        return group
+
+    def leaves(self):
+        if self.leaf_list is None:
+            self.leaf_list = self.objects()
+            for group in self.subgroups():
+                self.leaf_list.extend(group.leaves())
+        return self.leaf_list
+
+    def rows(self):
+        if self.leaf_rows is None:
+            self.leaf_rows = self.store.rows(self.leaves())
+        return self.leaf_rows
+
+    ## Transform
+    def transform(self):
+        return self.tx, self.ty, self.sx, self.sy
+
+    def set_transform(self, tx, ty, sx, sy):
+        self.tx, self.ty, self.sx, self.sy = tx, ty, sx, sy
+        self.update_world()
+        if self.parent is not None:
+            self.parent.invalidate()
+
+    def update_world(self):
+        # Compose with the parent's world transform, for this group and every nested one
+        store = self.store
+        if self.parent is None:
+            ptx, pty, psx, psy = 0.0, 0.0, 1.0, 1.0
+        else:
+            p = self.parent.id
+            ptx, pty, psx, psy = store.group_tx[p], store.group_ty[p], store.group_sx[p], store.group_sy[p]
+        store.group_tx[self.id] = ptx + psx * self.tx
+        store.group_ty[self.id] = pty + psy * self.ty
+        store.group_sx[self.id] = psx * self.sx
+        store.group_sy[self.id] = psy * self.sy
+        for group in self.subgroups():
+            group.update_world()
+
+    ## Cached bounds
+    def invalidate(self):
+        # A child's geometry changed; ancestors holding bounds are dropped too
+        group = self
+        while group is not None and group.content is not None:
+            group.content = None
+            group = group.parent
+
+    def invalidate_structure(self):
+        group = self
+        while group is not None:
+            group.leaf_list = None
+            group.leaf_rows = None
+            group.content = None
+            group = group.parent
+
+    def content_box(self):
+        if self.content is None:
+            x0 = y0 = math.inf
+            x1 = y1 = -math.inf
+            objects = self.objects()
+            if objects:
+                bx0, by0, bx1, by1 = self.store.local_bboxes(self.store.rows(objects))
+                x0, y0, x1, y1 = float(bx0.min()), float(by0.min()), float(bx1.max()), float(by1.max())
+            for group in self.subgroups():
+                cx0, cy0, cx1, cy1 = group.content_box()
+                x0 = min(x0, cx0 * group.sx + group.tx)
+                y0 = min(y0, cy0 * group.sy + group.ty)
+                x1 = max(x1, cx1 * group.sx + group.tx)
+                y1 = max(y1, cy1 * group.sy + group.ty)
+            if x0 > x1:
+                x0 = y0 = x1 = y1 = 0.0  # empty group
+            self.content = (x0, y0, x1, y1)
+        return self.content
+
+    def get_obj_bbox(self):
+        x0, y0, x1, y1 = self.content_box()
+        store, gid = self.store, self.id
+        sx, sy, tx, ty = store.group_sx[gid], store.group_sy[gid], store.group_tx[gid], store.group_ty[gid]
+        return float(x0 * sx + tx), float(y0 * sy + ty), float(x1 * sx + tx), float(y1 * sy + ty)
+
+    def get_obj_center(self):
+        x0, y0, x1, y1 = self.get_obj_bbox()
+        return (x0 + x1) * 0.5, (y0 + y1) * 0.5
+
+    def placed(self, x, y):
+        # Transform putting the top-left of the bounds at (x, y) in the parent's frame
+        x0, y0, _, _ = self.content_box()
+        return x - x0 * self.sx, y - y0 * self.sy, self.sx, self.sy
+
+    def resized(self, width, height):
+        # Transform giving the bounds this size in the parent's frame, top-left kept in place
+        x0, y0, x1, y1 = self.content_box()
+        sx = width / (x1 - x0) if x1 > x0 else self.sx
+        sy = height / (y1 - y0) if y1 > y0 else self.sy
+        left, top = x0 * self.sx + self.tx, y0 * self.sy + self.ty
+        return left - x0 * sx, top - y0 * sy, sx, sy
+
+    ## Hit testing
+    def nearest(self, x, y, limit=math.inf):
+        """Closest object below this group to (x, y) if nearer than limit, as (distance, object).
+
+        Subtrees whose bounds are no nearer than the best hit so far are skipped.
+        """
+        if box_distance(self.get_obj_bbox(), x, y) >= limit:
+            return limit, None
+        best, found = limit, None
+        for child in self.children:
+            if isinstance(child, Group):
+                distance, obj = child.nearest(x, y, best)
+            else:
+                distance, obj = child.distance_to(x, y), child
+            if distance < best:
+                best, found = distance, obj
+        return best, found
+
+    def distance_to(self, x, y):
+        return self.nearest(x, y)[0]
+
+    def leaves_in(self, min_x, min_y, max_x, max_y):
+        """Objects below this group whose bounds meet the rectangle."""
+        x0, y0, x1, y1 = self.get_obj_bbox()
+        if x1 < min_x or x0 > max_x or y1 < min_y or y0 > max_y:
+            return []
+        found = []
+        objects = self.objects()
+        if objects:
+            bx0, by0, bx1, by1 = self.store.bboxes(self.store.rows(objects))
+            hits = (bx1 >= min_x) & (bx0 <= max_x) & (by1 >= min_y) & (by0 <= max_y)
+            found.extend(obj for obj, hit in zip(objects, hits.tolist()) if hit)
+        for group in self.subgroups():
+            found.extend(group.leaves_in(min_x, min_y, max_x, max_y))
+        return found
+
+
+class SpatialIndex():
+    """Uniform grid over object bounding boxes used for hit testing.
+
+    Every object is registered in each cell its bounding box overlaps, so the
+    cell holding its center always lists it. Objects spanning more than
+    ``max_cells`` cells are kept in a small side list instead and checked
+    directly. Results match a linear scan over the objects in insertion order.
+    """
+    def __init__(self, cell_size=64, max_cells=256):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.cells = {}      # (col, row) -> set of objects
+        self.entries = {}    # object -> (insertion order, cell range or None)
+        self.oversized = {}  # objects too large for the grid, in insertion order
+        self.bounds = None   # (min_col, min_row, max_col, max_row) ever occupied
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def cell_of(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def cell_range(self, obj):
+        return self.cells_for(*obj.get_obj_bbox())
+
+    def cells_for(self, x0, y0, x1, y1):
+        if not all(map(math.isfinite, (x0, y0, x1, y1))):
+            return None
+        c0, r0 = self.cell_of(x0, y0)
+        c1, r1 = self.cell_of(x1, y1)
+        if (c1 - c0 + 1) * (r1 - r0 + 1) > self.max_cells:
+            return None
+        return c0, r0, c1, r1
+
+    def insert(self, obj, seq=None):
+        # seq orders ties; defaults to insertion order
+        if seq is None:
+            self.counter += 1
+            seq = self.counter
+        self.place(obj, seq)
+
+    def remove(self, obj):
+        seq, cells = self.entries.pop(obj)
+        if cells is None:
+            del self.oversized[obj]
+            return
+        c0, r0, c1, r1 = cells
+        for col in range(c0, c1 + 1):
+            for row in range(r0, r1 + 1):
+                bucket = self.cells[(col, row)]
+                bucket.discard(obj)
+                if not bucket:
+                    del self.cells[(col, row)]
+
+    def update(self, obj):
+        seq, cells = self.entries[obj]
+        if cells is not None and cells == self.cell_range(obj):
+            return
+        self.remove(obj)
+        self.place(obj, seq)
+
+    def update_many(self, objects, x0, y0, x1, y1):
+        # Bulk update from bounding box arrays; only objects that changed cells move
+        for obj, box in zip(objects, zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist())):
+            entry = self.entries.get(obj)
+            if entry is None:
+                continue
+            cells = self.cells_for(*box)
+            if cells is not None and cells == entry[1]:
+                continue
+            self.remove(obj)
+            self.place(obj, entry[0], cells)
+
+    def place(self, obj, seq, cells=False):
+        if cells is False:
+            cells = self.cell_range(obj)
+        self.entries[obj] = (seq, cells)
+        if cells is None:
+            self.oversized[obj] = None
+            return
+        c0, r0, c1, r1 = cells
+        for col in range(c0, c1 + 1):
+            for row in range(r0, r1 + 1):
+                self.cells.setdefault((col, row), set()).add(obj)
+        if self.bounds is None:
+            self.bounds = cells
+        else:
+            b = self.bounds
+            self.bounds = (min(b[0], c0), min(b[1], r0), max(b[2], c1), max(b[3], r1))
+
+    def ring(self, col, row, r):
+        if r == 0:
+            yield col, row
+            return
+        for c in range(col - r, col + r + 1):
+            yield c, row - r
+            yield c, row + r
+        for w in range(row - r + 1, row + r):
+            yield col - r, w
+            yield col + r, w
+
+    def nearest_center(self, x, y):
+        """Return the object closest to (x, y), or None.
+
+        Distance is to the center, or to the box for objects that hit test by
+        their bounds (text). Ties go to the object inserted first, like a
+        linear scan.
+        """
+        best = None
+        best_key = None
+
+        def consider(obj):
+            nonlocal best, best_key
+            key = (obj.distance_to(x, y), self.entries[obj][0])
+            if best_key is None or key < best_key:
+                best, best_key = obj, key
+
+        for obj in self.oversized:
+            consider(obj)
+
+        if not self.cells:
+            return best
+        col, row = self.cell_of(x, y)
+        b = self.bounds
+        limit = max(abs(col - b[0]), abs(col - b[2]), abs(row - b[1]), abs(row - b[3]))
+        r = 0
+        while r <= limit:
+            # Everything outside the rings seen so far is farther than (r-1) cells
+            if r > 0 and best_key is not None and best_key[0] <= (r - 1) * self.cell_size:
+                break
+            if 8 * r > len(self.cells):
+                # Sparse grid: cheaper to visit the remaining occupied cells directly
+                for (c, w), bucket in self.cells.items():
+                    if max(abs(c - col), abs(w - row)) >= r:
+                        for obj in bucket:
+                            consider(obj)
+                break
+            for key in self.ring(col, row, r):
+                for obj in self.cells.get(key, ()):
+                    consider(obj)
+            r += 1
+        return best
+
+    def candidates(self, min_x, min_y, max_x, max_y):
+        # Objects registered in any cell overlapping the rectangle, plus oversized ones
+        c0, r0 = self.cell_of(min_x, min_y)
+        c1, r1 = self.cell_of(max_x, max_y)
+        candidates = set(self.oversized)
+        if (c1 - c0 + 1) * (r1 - r0 + 1) > len(self.cells):
+            for (c, w), bucket in self.cells.items():
+                if c0 <= c <= c1 and r0 <= w <= r1:
+                    candidates.update(bucket)
+        else:
+            for col in range(c0, c1 + 1):
+                for row in range(r0, r1 + 1):
+                    candidates.update(self.cells.get((col, row), ()))
+        return candidates
+
+    def estimate_count(self, min_x, min_y, max_x, max_y, limit):
+        # Upper bound on objects near the rectangle (objects spanning several
+        # cells count more than once); stops counting past limit
+        c0, r0 = self.cell_of(min_x, min_y)
+        c1, r1 = self.cell_of(max_x, max_y)
+        count = len(self.oversized)
+        if (c1 - c0 + 1) * (r1 - r0 + 1) > len(self.cells):
+            buckets = (bucket for (c, w), bucket in self.cells.items() if c0 <= c <= c1 and r0 <= w <= r1)
+        else:
+            buckets = (self.cells[(c, w)] for c in range(c0, c1 + 1) for w in range(r0, r1 + 1) if (c, w) in self.cells)
+        for bucket in buckets:
+            count += len(bucket)
+            if count > limit:
+                break
+        return count
+
+    def intersecting(self, min_x, min_y, max_x, max_y):
+        """Return the set of objects whose bounding box meets the rectangle."""
+        found = set()
+        for obj in self.candidates(min_x, min_y, max_x, max_y):
+            x0, y0, x1, y1 = obj.get_obj_bbox()
+            if x1 >= min_x and x0 <= max_x and y1 >= min_y and y0 <= max_y:
+                found.add(obj)
+        return found
+
+    def centers_in_rect(self, min_x, min_y, max_x, max_y):
+        """Return objects whose center lies inside the rectangle, in insertion order."""
+        candidates = self.candidates(min_x, min_y, max_x, max_y)
+
+        found = []
+        for obj in candidates:
+            obj_x, obj_y = obj.get_obj_center()
+            if obj_x >= min_x and obj_x <= max_x and obj_y >= min_y and obj_y <= max_y:
+                found.append(obj)
+        found.sort(key=lambda obj: self.entries[obj][0])
+        return found
+
+
+class SnapIndex():
+    """Sorted edges and centers of every object, for snapping drags into alignment.
+
+    ``xs`` holds each object's left, center and right, ``ys`` its top, center
+    and bottom, both sorted and paired with the store row they came from, so
+    the coordinates near a value are found by bisection. Objects added, moved
+    or removed are only noted; ``prepare`` merges them in before a drag with
+    one sorted insert, or sorts everything again when most of the scene changed.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.xs, self.x_rows = np.empty(0), np.empty(0, dtype=np.intp)
+        self.ys, self.y_rows = np.empty(0), np.empty(0, dtype=np.intp)
+        self.live = np.zeros(1024, dtype=bool)   # by store row
+        self.stale = np.zeros(1024, dtype=bool)  # rows to index again
+        self.dirty = False
+
+    def add(self, row):
+        if row >= len(self.live):
+            grown = max(row + 1, 2 * len(self.live))
+            self.live = np.concatenate([self.live, np.zeros(grown - len(self.live), dtype=bool)])
+            self.stale = np.concatenate([self.stale, np.zeros(grown - len(self.stale), dtype=bool)])
+        self.live[row] = True
+        self.stale[row] = True
+        self.dirty = True
+
+    def remove(self, row):
+        self.live[row] = False
+        self.stale[row] = True
+        self.dirty = True
+
+    def touch(self, rows):
+        self.stale[rows] = True
+        self.dirty = True
+
+    def mask(self, rows):
+        # Flags for the rows a drag moves, which must not snap to themselves
+        flags = np.zeros(len(self.live), dtype=bool)
+        flags[rows] = True
+        return flags
+
+    @staticmethod
+    def sorted_entries(rows, low, high):
+        values = np.concatenate([low, (low + high) / 2, high])
+        rows = np.tile(rows, 3)
+        order = np.argsort(values)
+        return values[order], rows[order]
+
+    def prepare(self):
+        if not self.dirty:
+            return
+        rows = np.flatnonzero(self.stale)
+        stale, self.stale = self.stale, np.zeros(len(self.live), dtype=bool)
+        self.dirty = False
+        if len(rows) * 24 > len(self.xs):
+            # An eighth of the scene or more: sorting from scratch is cheaper
+            rows = np.flatnonzero(self.live)
+            x0, y0, x1, y1 = self.store.bboxes(rows)
+            self.xs, self.x_rows = self.sorted_entries(rows, x0, x1)
+            self.ys, self.y_rows = self.sorted_entries(rows, y0, y1)
+            return
+        rows = rows[self.live[rows]]
+        x0, y0, x1, y1 = self.store.bboxes(rows)
+        self.xs, self.x_rows = self.merge(self.xs, self.x_rows, stale, *self.sorted_entries(rows, x0, x1))
+        self.ys, self.y_rows = self.merge(self.ys, self.y_rows, stale, *self.sorted_entries(rows, y0, y1))
+
+    @staticmethod
+    def merge(values, rows, stale, new_values, new_rows):
+        keep = ~stale[rows]
+        values, rows = values[keep], rows[keep]
+        at = np.searchsorted(values, new_values)
+        return np.insert(values, at, new_values), np.insert(rows, at, new_rows)
+
+    def nearest(self, axis, values, tolerance, excluded=None):
+        """Closest indexed coordinate to any of values on axis 0 (x) or 1 (y).
+
+        Returns (shift, coordinate) for the smallest shift within tolerance,
+        or None. Rows flagged in the ``excluded`` mask are skipped.
+        """
+        coords, rows = (self.xs, self.x_rows) if axis == 0 else (self.ys, self.y_rows)
+        best = None
+        for value in values:
+            lo = coords.searchsorted(value - tolerance)
+            hi = coords.searchsorted(value + tolerance, 'right')
+            if lo == hi:
+                continue
+            near = coords[lo:hi]
+            if excluded is not None:
+                near = near[~excluded[rows[lo:hi]]]
+                if not len(near):
+                    continue
+            coord = float(near[np.abs(near - value).argmin()])
+            if best is None or abs(coord - value) < abs(best[0]):
+                best = (coord - value, coord)
+        return best
+
+
+class ZIndex():
+    """Objects ordered by (z, creation order), bottom first.
+
+    Keys live in sorted blocks of at most ``block_size`` with the last key of
+    each block kept alongside, so finding, inserting, removing or refiling an
+    object is two bisections plus a bounded list shift.
+    """
+    block_size = 1000
+
+    def __init__(self):
+        self.blocks = []   # sorted (z, row) keys, split into blocks
+        self.members = []  # the objects filed under those keys
+        self.maxes = []    # last key of each block
+        self.keys = {}     # object -> key it is filed under
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, obj):
+        return obj in self.keys
+
+    def __iter__(self):
+        for block in self.members:
+            yield from block
+
+    def locate(self, key):
+        # (block, position) of key, or of where it would be inserted
+        b = min(bisect.bisect_left(self.maxes, key), len(self.maxes) - 1)
+        return b, bisect.bisect_left(self.blocks[b], key)
+
+    def add(self, obj):
+        self.discard(obj)
+        key = self.keys[obj] = (obj.z, obj.row)
+        if not self.blocks:
+            self.blocks.append([key])
+            self.members.append([obj])
+            self.maxes.append(key)
+            return
+        b, i = self.locate(key)
+        block, members = self.blocks[b], self.members[b]
+        block.insert(i, key)
+        members.insert(i, obj)
+        if len(block) > self.block_size:
+            half = len(block) // 2
+            self.blocks.insert(b + 1, block[half:])
+            self.members.insert(b + 1, members[half:])
+            self.maxes.insert(b + 1, block[-1])
+            del block[half:]
+            del members[half:]
+        self.maxes[b] = block[-1]
+
+    def discard(self, obj):
+        key = self.keys.pop(obj, None)
+        if key is None:
+            return False
+        b, i = self.locate(key)
+        del self.blocks[b][i]
+        del self.members[b][i]
+        if self.blocks[b]:
+            self.maxes[b] = self.blocks[b][-1]
+        else:
+            del self.blocks[b], self.members[b], self.maxes[b]
+        return True
+
+    def update(self, obj):
+        # Refile obj if its z changed; True if it was moved
+        key = self.keys.get(obj)
+        if key is None or key == (obj.z, obj.row):
+            return False
+        self.add(obj)
+        return True
+
+    def first(self):
+        return self.members[0][0] if self.members else None
+
+    def last(self):
+        return self.members[-1][-1] if self.members else None
+
+    def below(self, obj):
+        b, i = self.locate(self.keys[obj])
+        if i:
+            return self.members[b][i - 1]
+        return self.members[b - 1][-1] if b else None
+
+    def above(self, obj):
+        b, i = self.locate(self.keys[obj])
+        if i + 1 < len(self.members[b]):
+            return self.members[b][i + 1]
+        return self.members[b + 1][0] if b + 1 < len(self.members) else None
+
+    def first_above(self, z):
+        # Lowest object with a greater z
+        if not self.blocks:
+            return None
+        key = (z, math.inf)
+        b = bisect.bisect_right(self.maxes, key)
+        if b == len(self.maxes):
+            return None
+        return self.members[b][bisect.bisect_right(self.blocks[b], key)]
+
+    def last_below(self, z):
+        # Highest object with a smaller z
+        if not self.blocks:
+            return None
+        key = (z, -math.inf)
+        b, i = self.locate(key)
+        if i:
+            return self.members[b][i - 1]
+        return self.members[b - 1][-1] if b else None
+
+    def z_above(self, obj):
+        # A z filing an object above obj and everything sharing its z
+        upper = self.first_above(obj.z)
+        return obj.z + 1 if upper is None else (obj.z + upper.z) / 2
+
+    def z_below(self, obj):
+        lower = self.last_below(obj.z)
+        return obj.z - 1 if lower is None else (lower.z + obj.z) / 2
+
+
+def longest_increasing_run(values):
+    """Return the set of indices of one longest strictly increasing subsequence."""
+    tails = []     # tails[k] = index of the smallest tail of a run of length k+1
+    parents = [-1] * len(values)
+    for i, v in enumerate(values):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if values[tails[mid]] < v:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0:
+            parents[i] = tails[lo - 1]
+        if lo == len(tails):
+            tails.append(i)
+        else:
+            tails[lo] = i
+
+    run = set()
+    i = tails[-1] if tails else -1
+    while i != -1:
+        run.add(i)
+        i = parents[i]
+    return run
+
+
+class LatencyMeter():
+    """Rolling record of event-to-screen latencies, in milliseconds.
+
+    Latencies start at the event's server timestamp (see ``event_time``), so
+    time spent queued before Tk handed the event over is included.
+    """
+    def __init__(self, target_ms=1000 / 60, size=512):
+        self.target_ms = target_ms
+        self.samples = deque(maxlen=size)
+        self.offset = None  # perf_counter seconds minus server seconds, for the least delayed event seen
+
+    def event_time(self, event):
+        """perf_counter time at which event was generated.
+
+        X timestamps are milliseconds from an unknown epoch, so they are mapped
+        onto perf_counter through the smallest offset seen: latencies are
+        relative to the quickest event delivered, and a constant transport
+        delay is not counted. Events without a timestamp count from now.
+        """
+        now = time.perf_counter()
+        stamp = getattr(event, 'time', None)
+        if not isinstance(stamp, int) or stamp <= 0:
+            return now
+        offset = now - stamp / 1000
+        if self.offset is None or offset < self.offset or offset - self.offset > 60:
+            self.offset = offset  # first event, a quicker one, or the server clock wrapped
+        return stamp / 1000 + self.offset
+
+    def add(self, ms):
+        self.samples.append(ms)
+
+    def clear(self):
+        self.samples.clear()
+
+    def percentile(self, p):
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def summary(self):
+        if not self.samples:
+            return {'count': 0, 'target_ms': self.target_ms}
+        return {
+            'count': len(self.samples),
+            'mean_ms': sum(self.samples) / len(self.samples),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'max_ms': max(self.samples),
+            'target_ms': self.target_ms,
+            'over_target': sum(ms > self.target_ms for ms in self.samples),
+        }
+
+    def report(self):
+        stats = self.summary()
+        if not stats['count']:
+            return "Drag latency: -"
+        flag = "OK" if stats['p95_ms'] <= self.target_ms else "SLOW"
+        return f"Drag latency p95 {stats['p95_ms']:.1f} ms / {self.target_ms:.1f} ms {flag}"
+
+
+class Histogram():
+    """Bucketed durations in milliseconds; constant cost per sample."""
+    edges = (1, 2, 4, 8, 16, 33, 50, 100, 250, 500, 1000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(self.edges, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        # Upper edge of the bucket holding the p-th percentile
+        rank = self.count * p / 100
+        seen = 0
+        for edge, n in zip(self.edges, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(edge, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        buckets = {f"<={edge}": n for edge, n in zip(self.edges, self.counts)}
+        buckets[f">{self.edges[-1]}"] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'max_ms': self.max,
+            'buckets': buckets,
+        }
+
+
+class Instrumentation():
+    """Opt-in timing of the editor's handlers and of Tk event-loop lag.
+
+    While disabled nothing is wrapped or scheduled. Enabling shadows the
+    handlers with timed wrappers on the editor instance, starts a root.after
+    probe that records how late the event loop runs it, and shows a stats
+    overlay on the canvas.
+    """
+    handlers = ('on_press', 'on_drag', 'on_release', 'draw_by_z_order', 'update_all_frame')
+    bindings = {'on_press': "<ButtonPress-1>", 'on_drag': "<B1-Motion>", 'on_release': "<ButtonRelease-1>"}
+    probe_ms = 50
+    overlay_ms = 1000  # also how often canvas items and Python objects are counted
+
+    def __init__(self, editor):
+        self.editor = editor
+        self.enabled = False
+        self.timings = {name: Histogram() for name in self.handlers}
+        self.lag = Histogram()
+        self.counts = {}
+        self.probe_id = None
+        self.probe_due = 0
+        self.overlay = None
+        self.overlay_id = None
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for name in self.handlers:
+            setattr(self.editor, name, self.timed(name, getattr(self.editor, name)))
+        self.rebind()
+        self.schedule_probe()
+        self.overlay = tk.Label(self.editor.canvas, justify=tk.LEFT, anchor=tk.NW, font=("Courier", 9),
+                                bg="lightyellow", bd=1, relief=tk.SOLID)
+        self.overlay.place(relx=1.0, x=-4, y=4, anchor=tk.NE)
+        self.refresh_overlay()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for name in self.handlers:
+            vars(self.editor).pop(name, None)
+        self.rebind()
+        for after_id in (self.probe_id, self.overlay_id):
+            if after_id is not None:
+                self.editor.root.after_cancel(after_id)
+        self.probe_id = self.overlay_id = None
+        self.overlay.destroy()
+        self.overlay = None
+
+    def rebind(self):
+        # Canvas bindings hold the bound methods, so point them at the current ones
+        for name, sequence in self.bindings.items():
+            self.editor.canvas.bind(sequence, getattr(self.editor, name))
+
+    def timed(self, name, func):
+        histogram = self.timings[name]
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.add((time.perf_counter() - start) * 1000)
+        return wrapper
+
+    def schedule_probe(self):
+        self.probe_due = time.perf_counter() + self.probe_ms / 1000
+        self.probe_id = self.editor.root.after(self.probe_ms, self.probe)
+
+    def probe(self):
+        self.lag.add(max(0.0, (time.perf_counter() - self.probe_due) * 1000))
+        self.schedule_probe()
+
+    def sample_counts(self):
+        editor = self.editor
+        self.counts = {
+            'objects': len(editor.objects),
+            'shown': len(editor.store.view.shown),
+            'canvas_items': len(editor.canvas.find_all()),
+            'python_objects': len(gc.get_objects()),
+        }
+
+    def refresh_overlay(self):
+        self.sample_counts()
+        self.overlay.config(text=self.report())
+        self.overlay_id = self.editor.root.after(self.overlay_ms, self.refresh_overlay)
+
+    def report(self):
+        lines = [f"{'':<17}{'n':>7}{'mean':>8}{'p95':>7}{'max':>8}"]
+        for name, histogram in [('event loop lag', self.lag)] + list(self.timings.items()):
+            if histogram.count:
+                lines.append(f"{name:<17}{histogram.count:>7}{histogram.total / histogram.count:>8.1f}"
+                             f"{histogram.percentile(95):>7}{histogram.max:>8.1f}")
+            else:
+                lines.append(f"{name:<17}{0:>7}")
+        lines.append("  ".join(f"{name} {count}" for name, count in self.counts.items()))
+        return "\n".join(lines)
+
+    def stats(self):
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'enabled': self.enabled,
+            'probe_ms': self.probe_ms,
+            'event_loop_lag': self.lag.summary(),
+            'handlers': {name: histogram.summary() for name, histogram in self.timings.items()},
+            'drag_latency': self.editor.drag_latency.summary(),
+            'counts': self.counts,
+        }
+
+    def dump(self, path):
+        if self.enabled:
+            self.sample_counts()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.stats(), f, indent=2)
+
+
+## Undo / redo
+class ColumnEdit():
+    """Columns of a selection set to new values; remembers the old ones."""
+    def __init__(self, objects, rows, columns, before, after):
+        self.objects = objects
+        self.rows = rows
+        self.columns = columns
+        self.before = before  # one array per column
+        self.after = after    # one scalar or array per column
+        self.nbytes = rows.nbytes + sum(np.asarray(v).nbytes for v in before + after) + 8 * len(objects)
+
+    def apply(self, editor, values):
+        store = editor.store
+        for column, value in zip(self.columns, values):
+            getattr(store, column)[self.rows] = value
+        editor.refresh_objects(self.objects, self.columns)
+
+    def undo(self, editor):
+        self.apply(editor, self.before)
+
+    def redo(self, editor):
+        self.apply(editor, self.after)
+
+
+class MoveEdit():
+    """A selection moved by (dx, dy); consecutive drag steps merge into one.
+
+    Selected groups move by their transform; ``rows`` are the other objects.
+    """
+    def __init__(self, objects, rows, dx, dy, groups=()):
+        self.objects = objects
+        self.rows = rows
+        self.dx = dx
+        self.dy = dy
+        self.groups = groups
+        self.nbytes = rows.nbytes + 8 * len(objects)
+
+    def merge(self, other):
+        self.dx += other.dx
+        self.dy += other.dy
+
+    def apply(self, editor, dx, dy):
+        with editor.transaction():
+            if len(self.rows):
+                editor.store.move_by(self.rows, dx, dy)
+                editor.refresh_objects(self.objects, ('x', 'y'))
+            if self.groups:
+                for group in self.groups:
+                    group.set_transform(group.tx + dx, group.ty + dy, group.sx, group.sy)
+                editor.refresh_groups(self.groups)
+
+    def undo(self, editor):
+        self.apply(editor, -self.dx, -self.dy)
+
+    def redo(self, editor):
+        self.apply(editor, self.dx, self.dy)
+
+
+class SymbolEdit(ColumnEdit):
+    """A symbol redefined, with the columns of its instances that followed it."""
+    def __init__(self, symbol, objects, rows, columns, before, after, old, new):
+        super().__init__(objects, rows, columns, before, after)
+        self.symbol = symbol
+        self.old = old  # symbol attributes before and after
+        self.new = new
+
+    def apply(self, editor, values, attrs):
+        # Shared text is not a column, but its items need the same restyle pass
+        self.symbol.redefine(**attrs)
+        store = editor.store
+        for column, value in zip(self.columns, values):
+            getattr(store, column)[self.rows] = value
+        editor.refresh_objects(self.objects, self.columns + ('text',) if 'text' in attrs else self.columns)
+
+    def undo(self, editor):
+        self.apply(editor, self.before, self.old)
+
+    def redo(self, editor):
+        self.apply(editor, self.after, self.new)
+
+
+class ReplaceEdit():
+    """Objects swapped for others, e.g. a shape turned into a symbol instance."""
+    def __init__(self, removed, added):
+        self.removed = removed
+        self.added = added
+        self.nbytes = 8 * (len(removed) + len(added))
+
+    def undo(self, editor):
+        editor.remove_objects(self.added)
+        editor.restore_objects(self.removed)
+
+    def redo(self, editor):
+        editor.remove_objects(self.removed)
+        editor.restore_objects(self.added)
+
+
+class GroupEdit():
+    """Top-level objects and groups gathered into a new group."""
+    def __init__(self, group):
+        self.group = group
+        self.nbytes = 8 * len(group.children)
+
+    def undo(self, editor):
+        editor.dissolve_group(self.group)
+
+    def redo(self, editor):
+        editor.attach_group(self.group)
+
+
+class UngroupEdit():
+    """A group dissolved, with what its transform was baked into."""
+    def __init__(self, group, baked):
+        self.group = group
+        self.baked = baked  # (rows, [x, y, width, height, pad_x, pad_y, font_size] before, [transforms of subgroups] before)
+        self.nbytes = baked[0].nbytes * 8 + 8 * len(group.children)
+
+    def undo(self, editor):
+        editor.restore_baked(self.group, self.baked)
+        editor.attach_group(self.group)
+
+    def redo(self, editor):
+        editor.dissolve_group(self.group)
+
+
+class TransformEdit():
+    """Groups moved or resized by replacing their transforms."""
+    def __init__(self, groups, before, after):
+        self.groups = groups
+        self.before = before  # one (tx, ty, sx, sy) per group
+        self.after = after
+        self.nbytes = 64 * len(groups)
+
+    def apply(self, editor, transforms):
+        for group, transform in zip(self.groups, transforms):
+            group.set_transform(*transform)
+        editor.refresh_groups(self.groups, restyle=True)
+
+    def undo(self, editor):
+        self.apply(editor, self.before)
+
+    def redo(self, editor):
+        self.apply(editor, self.after)
+
+
+class CompoundEdit():
+    """Several edits made by one action, undone and redone together."""
+    def __init__(self, edits):
+        self.edits = edits
+        self.nbytes = sum(edit.nbytes for edit in edits)
+
+    def undo(self, editor):
+        for edit in reversed(self.edits):
+            edit.undo(editor)
+
+    def redo(self, editor):
+        for edit in self.edits:
+            edit.redo(editor)
+
+
+class CreateEdit():
+    """Objects added to the scene."""
+    def __init__(self, objects):
+        self.objects = objects
+        self.nbytes = 8 * len(objects)
+
+    def undo(self, editor):
+        editor.remove_objects(self.objects)
+
+    def redo(self, editor):
+        editor.restore_objects(self.objects)
+
+
+class EditHistory():
+    """Undo/redo log of compact edit deltas, capped at ``max_bytes`` over both stacks.
+
+    Edits pushed with the same ``merge_key`` as the newest entry are merged
+    into it (used for the steps of one drag).
+    """
+    def __init__(self, max_bytes=64 * 2**20):
+        self.max_bytes = max_bytes
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.used = 0  # bytes of the undo and redo stacks together
+        self.last_key = None
+        self.listener = None  # called with (edit, undone) after every change, e.g. by Autosave
+
+    def record(self, edit, merge_key=None):
+        self.used -= sum(undone.nbytes for undone in self.redo_stack)
+        self.redo_stack.clear()
+        if self.listener is not None:
+            self.listener(edit, False)
+        if merge_key is not None and merge_key == self.last_key and self.undo_stack:
+            self.undo_stack[-1].merge(edit)
+            return
+        self.last_key = merge_key
+        self.undo_stack.append(edit)
+        self.used += edit.nbytes
+        # Drop the oldest entries past the cap, but always keep the newest
+        while self.used > self.max_bytes and len(self.undo_stack) > 1:
+            self.used -= self.undo_stack.popleft().nbytes
+
+    def undo(self, editor):
+        if not self.undo_stack:
+            return False
+        edit = self.undo_stack.pop()
+        edit.undo(editor)
+        self.redo_stack.append(edit)
+        self.last_key = None
+        if self.listener is not None:
+            self.listener(edit, True)
+        return True
+
+    def redo(self, editor):
+        if not self.redo_stack:
+            return False
+        edit = self.redo_stack.pop()
+        edit.redo(editor)
+        self.undo_stack.append(edit)
+        self.last_key = None
+        if self.listener is not None:
+            self.listener(edit, False)
+        return True
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.used = 0
+        self.last_key = None
+
+
+class Autosave():
+    """Journals every edit to disk for crash recovery (see journal.py).
+
+    Objects are named by their store row, which is never reused within a
+    scene. Entries are built from data the edits already hold and handed to
+    the journal's writer thread, so edits never wait on the disk. After
+    ``compact_every`` entries, or when the scene is replaced, the journal is
+    compacted into a snapshot once the editor is idle. Until the first
+    snapshot of a new scene is taken, edits are not journaled.
+    """
+    compact_every = 5000   # journal entries between snapshots
+    compact_delay_ms = 1000
+    put_limit = 10000      # larger creations are saved by a snapshot instead
+    columns = ('x', 'y', 'width', 'height', 'font_size', 'z', 'color')
+
+    def __init__(self, editor, directory):
+        self.editor = editor
+        self.directory = directory
+        self.journal = None
+        self.count = 0
+        self.stale = True
+        self.compact_id = None
+
+    def start(self):
+        """Offer to recover what a previous session left, then start journaling."""
+        recovery = journal.recover(self.directory)
+        self.journal = journal.Journal(self.directory)
+        if recovery is not None and messagebox.askyesno("", f"Recover {len(recovery)} autosaved objects and edits from the last session?"):
+            self.replay(recovery)
+        self.editor.history.listener = self.edit_done
+        self.compact()
+
+    def close(self, discard=True):
+        if self.journal is None:
+            return
+        if self.compact_id is not None:
+            self.editor.root.after_cancel(self.compact_id)
+        self.editor.history.listener = None
+        self.journal.close(discard)
+        self.journal = None
+
+    ## Journaling
+    def scene_changed(self):
+        # Rows restart with a new store: wait for a snapshot of the new scene
+        self.stale = True
+        self.schedule_compact()
+
+    def edit_done(self, edit, undone):
+        if self.ready():
+            self.write(self.entries(edit, undone))
+
+    def resized(self, objects):
+        # Sizes set outside the undo history, as when image placeholders are decoded
+        if not self.ready():
+            return
+        store = self.editor.store
+        rows = store.rows(objects)
+        if len(store.groups) > 1 and store.group[rows].any():
+            self.write(None)  # grouped sizes are local
+            return
+        self.write([self.set_entry(rows, column, getattr(store, column)[rows].copy()) for column in ('width', 'height')])
+
+    def removed(self, objects):
+        # Objects dropped outside the undo history, as placeholders whose file failed to decode
+        if self.ready():
+            self.write([self.delete_entry(objects)])
+
+    def ready(self):
+        if self.stale or self.journal is None:
+            return False
+        error = self.journal.error
+        if error is not None:
+            self.close(discard=False)
+            messagebox.showwarning("", f"Autosave stopped:\n{error}")
+            return False
+        return True
+
+    def write(self, entries):
+        if entries is None:
+            self.scene_changed()  # not expressible as entries: snapshot instead
+            return
+        for entry in entries:
+            self.journal.append(entry)
+        self.count += len(entries)
+        if self.count >= self.compact_every:
+            self.schedule_compact()
+
+    def entries(self, edit, undone):
+        if isinstance(edit, MoveEdit):
+            if edit.groups:
+                return None
+            sign = -1 if undone else 1
+            return [{'op': 'move', 'rows': edit.rows, 'dx': sign * edit.dx, 'dy': sign * edit.dy}]
+        if isinstance(edit, ColumnEdit):
+            retext = isinstance(edit, SymbolEdit) and 'text' in edit.new
+            geometry = retext or any(column in ('x', 'y', 'width', 'height') for column in edit.columns)
+            if geometry and len(self.editor.store.groups) > 1 and self.editor.store.group[edit.rows].any():
+                return None  # grouped geometry is local; snapshots store where objects appear
+            entries = [self.set_entry(edit.rows, column, values)
+                       for column, values in zip(edit.columns, edit.before if undone else edit.after)
+                       if column in self.columns]
+            if retext:
+                entries.append(self.put_entry(edit.objects))
+            return entries
+        if isinstance(edit, CreateEdit):
+            return [self.delete_entry(edit.objects) if undone else self.put_entry(edit.objects)]
+        if isinstance(edit, ReplaceEdit):
+            removed, added = (edit.added, edit.removed) if undone else (edit.removed, edit.added)
+            return [self.delete_entry(removed), self.put_entry(added)]
+        return None
+
+    def set_entry(self, rows, column, values):
+        if column != 'color':
+            return {'op': 'set', 'rows': rows, 'column': column, 'values': values}
+        palette = self.editor.store.palette  # append-only, so the codes stay valid
+        def entry():
+            names = [palette[code] for code in np.atleast_1d(values).tolist()]
+            return {'op': 'set', 'rows': rows, 'column': column, 'values': names if np.ndim(values) else names[0]}
+        return entry
+
+    def delete_entry(self, objects):
+        return {'op': 'delete', 'rows': [obj.row for obj in objects]}
+
+    def put_entry(self, objects):
+        if len(objects) > self.put_limit:
+            self.scene_changed()
+            return {'op': 'put', 'records': []}
+        # Columns are copied now; the rest of a record never changes after creation
+        store = self.editor.store
+        rows = store.rows(objects)
+        columns = {name: getattr(store, name)[rows] for name in self.columns}
+        palette = store.palette
+        shared = [(obj.type.lower(), getattr(obj, 'text', None), getattr(obj, 'image_path', None), getattr(obj, 'image_data', None))
+                  for obj in objects]
+        def entry():
+            records = []
+            values = {name: column.tolist() for name, column in columns.items()}
+            for i, (kind, text, image_path, image_data) in enumerate(shared):
+                record = {name: values[name][i] for name in self.columns}
+                record.update(row=int(rows[i]), type=kind, color=palette[record['color']])
+                if kind == 'text':
+                    record['text'] = text
+                elif kind == 'image':
+                    record['image_path'] = image_path
+                    if image_data is not None:
+                        record['image_data'] = base64.b64encode(bytes(image_data)).decode('ascii')
+                records.append(record)
+            return {'op': 'put', 'records': records}
+        return entry
+
+    ## Snapshots
+    def schedule_compact(self):
+        if self.compact_id is None and self.journal is not None:
+            self.compact_id = self.editor.root.after(self.compact_delay_ms, self.compact_when_idle)
+
+    def compact_when_idle(self):
+        self.compact_id = None
+        editor = self.editor
+        if editor.button_down or editor.document_load is not None or editor.svg_import is not None:
+            self.schedule_compact()
+            return
+        self.compact()
+
+    def compact(self):
+        editor = self.editor
+        objects = list(editor.objects)
+        store = journal.FrozenStore(editor.store, editor.store.rows(objects))
+        self.journal.compact(objects, store, editor.canvas.winfo_width(), editor.canvas.winfo_height())
+        self.count = 0
+        self.stale = False
+
+    ## Recovery
+    def replay(self, recovery):
+        editor = self.editor
+        factory = GraphicObjectFactory()
+        objects = {}  # journal row -> object
+        failed = []
+
+        def create(row, record):
+            try:
+                obj = factory.create_from_record(editor.canvas, record)
+            except OSError as e:
+                failed.append(str(e))
+                return
+            objects[row] = editor.add_object(obj)
+
+        with editor.transaction():
+            with document.Document(recovery.snapshot) as doc:
+                for row, record in zip(recovery.rows, doc.iter_records()):
+                    create(row, record)
+            for entry in recovery.entries:
+                op = entry['op']
+                if op == 'put':
+                    replaced = [objects.pop(record['row']) for record in entry['records'] if record['row'] in objects]
+                    editor.remove_objects(replaced)
+                    for record in entry['records']:
+                        if 'image_data' in record:
+                            record['image_data'] = base64.b64decode(record['image_data'])
+                        create(record['row'], record)
+                    continue
+                found = [objects[row] for row in entry['rows'] if row in objects]
+                if op == 'delete':
+                    editor.remove_objects(found)
+                    for row in entry['rows']:
+                        objects.pop(row, None)
+                    continue
+                # Moves and column sets; rows of objects that failed to load are skipped
+                keep = [i for i, row in enumerate(entry['rows']) if row in objects]
+                rows = editor.store.rows(found)
+                if op == 'move':
+                    editor.store.move_by(rows, entry['dx'], entry['dy'])
+                    editor.refresh_objects(found, ('x', 'y'))
+                elif op == 'set':
+                    values = entry['values']
+                    if isinstance(values, list):
+                        values = [values[i] for i in keep]
+                    if entry['column'] == 'color':
+                        values = [editor.store.color_code(v) for v in values] if isinstance(values, list) else editor.store.color_code(values)
+                    getattr(editor.store, entry['column'])[rows] = values
+                    editor.refresh_objects(found, (entry['column'],))
+        editor.objects.sort(key=lambda obj: obj.row)
+        if failed:
+            messagebox.showwarning("", "Some recovered images could not be opened:\n" + "\n".join(failed[:20]))
+
+
+## Selection panel
+class SelectionSummary():
+    """Count, bounding box, distinct colors and z range of a selection.
+
+    Kept up to date as objects join and leave the selection: additions widen
+    the bounds and adjust the color counts directly. The bounds are recomputed
+    over the selection's rows only when a leaving object touched them or the
+    selected objects themselves were edited.
+    """
+    def __init__(self, store=None):
+        self.reset(store)
+
+    def reset(self, store):
+        self.store = store
+        self.members = set()
+        self.colors = Counter()  # color code -> selected objects with it
+        self.box = None  # (x0, y0, x1, y1)
+        self.z = None  # (lowest, highest)
+        self.stale = set()  # of 'box', 'z', 'colors'
+
+    def __len__(self):
+        return len(self.members)
+
+    def add(self, objects):
+        objects = [obj for obj in objects if obj not in self.members]
+        if not objects:
+            return
+        self.members.update(objects)
+        rows = self.store.rows(objects)
+        if 'colors' not in self.stale:
+            self.colors.update(self.store.color[rows].tolist())
+        if 'box' not in self.stale:
+            self.box = self.merge(self.box, self.store.bbox(rows))
+        if 'z' not in self.stale:
+            z = self.store.z[rows]
+            self.z = self.merge(self.z, (float(z.min()), float(z.max())))
+
+    def remove(self, objects):
+        objects = [obj for obj in objects if obj in self.members]
+        if not objects:
+            return
+        self.members.difference_update(objects)
+        if not self.members:
+            self.reset(self.store)
+            return
+        rows = self.store.rows(objects)
+        if 'colors' not in self.stale:
+            self.colors.subtract(self.store.color[rows].tolist())
+            self.colors = +self.colors  # drop colors no longer selected
+        if 'box' not in self.stale:
+            x0, y0, x1, y1 = self.store.bbox(rows)
+            b = self.box
+            if x0 <= b[0] or y0 <= b[1] or x1 >= b[2] or y1 >= b[3]:
+                self.stale.add('box')
+        if 'z' not in self.stale:
+            z = self.store.z[rows]
+            if z.min() <= self.z[0] or z.max() >= self.z[1]:
+                self.stale.add('z')
+
+    @staticmethod
+    def merge(bounds, other):
+        if bounds is None:
+            return other
+        half = len(other) // 2
+        return tuple(min(a, b) for a, b in zip(bounds[:half], other[:half])) + \
+            tuple(max(a, b) for a, b in zip(bounds[half:], other[half:]))
+
+    def invalidate(self, columns):
+        # Selected objects were edited: recompute what the columns feed, when next asked
+        if any(column in ('x', 'y', 'width', 'height', 'pad_x', 'pad_y') for column in columns):
+            self.stale.add('box')
+        if 'z' in columns:
+            self.stale.add('z')
+        if 'color' in columns:
+            self.stale.add('colors')
+
+    def refresh(self):
+        if not self.stale or not self.members:
+            return
+        rows = self.store.rows(list(self.members))
+        if 'box' in self.stale:
+            self.box = self.store.bbox(rows)
+        if 'z' in self.stale:
+            z = self.store.z[rows]
+            self.z = (float(z.min()), float(z.max()))
+        if 'colors' in self.stale:
+            self.colors = Counter(self.store.color[rows].tolist())
+        self.stale.clear()
+
+    def color_names(self):
+        self.refresh()
+        # Most common first; ties in palette order
+        codes = sorted(self.colors, key=lambda code: (-self.colors[code], code))
+        return [self.store.palette[code] for code in codes]
+
+    def text(self):
+        if not self.members:
+            return "Selected: none"
+        self.refresh()
+        x0, y0, x1, y1 = self.box
+        colors = self.color_names()
+        shown = ", ".join(str(color) for color in colors[:4]) + (", ..." if len(colors) > 4 else "")
+        return (f"Selected: {len(self.members)}\n"
+                f"Bounds: ({x0:g}, {y0:g}) - ({x1:g}, {y1:g})\n"
+                f"Colors: {len(colors)} ({shown})\n"
+                f"Z-order: {self.z[0]:g} .. {self.z[1]:g}")
+
+
+class SelectionInspector():
+    """Summary of the selection plus a virtualized list of its objects.
+
+    The list owns ``rows`` text items on its canvas; scrolling points them at
+    other objects, so showing a selection of 50k objects costs as much as
+    showing 20.
+    """
+    rows = 20
+    row_height = 16
+
+    def __init__(self, summary_label, list_canvas, scrollbar):
+        self.summary_label = summary_label
+        self.canvas = list_canvas
+        self.scrollbar = scrollbar
+        self.summary = SelectionSummary()
+        self.selection = []
+        self.first = 0  # index of the object in the top row
+        self.items = [list_canvas.create_text(4, i * self.row_height + 1, anchor=tk.NW, text="", font=("Courier", 9))
+                      for i in range(self.rows)]
+
+    def show(self, selection, store):
+        if store is not self.summary.store:
+            self.summary.reset(store)
+        if selection is not self.selection:
+            chosen = set(selection)
+            leaving = [obj for obj in self.summary.members if obj not in chosen]
+            if len(leaving) > len(chosen):
+                self.summary.reset(store)  # mostly a new selection: cheaper to start over
+            else:
+                self.summary.remove(leaving)
+            self.summary.add(selection)
+            self.selection = selection
+            self.first = 0
+        self.summary_label.config(text=self.summary.text())
+        self.render_rows()
+
+    def render_rows(self):
+        count = len(self.selection)
+        for i, item in enumerate(self.items):
+            k = self.first + i
+            self.canvas.itemconfig(item, text=self.row_text(self.selection[k]) if k < count else "")
+        if count:
+            self.scrollbar.set(self.first / count, min(1.0, (self.first + self.rows) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    @staticmethod
+    def row_text(obj):
+        x, y = obj.get_obj_pos()
+        return f"{obj.get_obj_id():<18}{obj.get_obj_color():<9}({x:g}, {y:g})  z {obj.get_obj_z():g}"
+
+    def scroll_to(self, first):
+        first = max(0, min(first, len(self.selection) - self.rows))
+        if first != self.first:
+            self.first = first
+            self.render_rows()
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.first + rows)
+
+    def yview(self, *args):
+        # Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units' / 'pages')
+        if args[0] == 'moveto':
+            self.scroll_to(round(float(args[1]) * len(self.selection)))
+        elif args[0] == 'scroll':
+            self.scroll_by(int(args[1]) * (self.rows if args[2] == 'pages' else 1))
+
 
 class VectorGraphicEditor:
     def __init__(self, root):
@@ -164,14 +2511,69 @@ class VectorGraphicEditor:
         self.modify_mode = 'color' # 'color', 'position', 'size'
         self.start_x = None
         self.start_y = None
-        self.current_object = None
+        self.current_object = None  # drag preview item, reused for the whole drag
         self.selected_objects = []
 
+        # Motion events are coalesced to at most one preview update per frame
+        self.frame_ms = 16
+        self.pending_drag = None  # (latest event, time the oldest unapplied one was generated)
+        self.drag_flush_id = None
+        self.last_drag_flush = 0
+        self.drag_latency = LatencyMeter()  # of the current (or last) drag
+        self.instrumentation = Instrumentation(self)  # F12 toggles, Shift+F12 saves the stats
+        self.image_loader = ImageLoader(root, self.image_loaded)
+        self.loading_images = {}  # path -> (placeholder ImageObject, its CreateEdit) waiting for it
+        self.failed_images = []
+        self.placeholder_size = 64
+        self.svg_import = None  # the svg.Importer being streamed in, if any
+        self.document_load = None  # the document.Document being streamed in, if any
+        self.button_down = False
+        self.autosave = None  # Autosave, once enable_autosave is called
+        self.current_symbol = None  # placed by Stamp mode
+
+        self.history = EditHistory()
+        self.frames_pending = False  # update_all_frame was asked for inside a transaction
+        self.drag_count = 0  # identifies the current drag for merging its move steps
+        self.drag_rows = None
+        self.drag_objects = []
+        self.drag_groups = []  # dragged by their transforms, not their objects' rows
+        self.drag_box = None  # world bounds of the dragged selection when the drag started
+        self.drag_offset = (0, 0)  # how far it has been moved so far
+        self.drag_excluded = None  # SnapIndex.mask of the dragged rows
+        self.leaf_selection = None  # (selection, leaf lists of its groups, leaves) last given by selection_leaves
+
         self.color='black'
         self.text = ''
 
+        self.build_toolbar()
+        self.build_canvas()
+        # The right column is not needed for the first frame; build it once the canvas is shown
+        self.inspector = None
+        self.canvas.bind("<Expose>", self.on_first_expose)
+
+        self.objects = []  # List to store drawn objects
+        self.store = SceneStore.of(self.canvas)  # Columnar geometry / z / color of all objects
+        self.spatial_index = SpatialIndex()  # Hit testing for select / multiselect
+        self.snap_index = SnapIndex(self.store)  # Edges and centers that drags snap to
+        self.snap_distance = 6  # screen pixels; 0 turns snapping off
+        self.hit_distance = 4  # screen pixels around an object where a press still drags it
+        self.guide_items = None  # (vertical, horizontal) alignment guide lines, created once
+        self.guide_positions = [None, None]  # world x / y they are shown at
+
+        self.min_scale = 1 / 64
+        self.max_scale = 8
+        self.max_live_items = 20000  # above this many visible objects, draw overview tiles instead
+        self.overview_tile_size = 8  # smallest overview tile, in screen pixels
+        self.world_bounds = (0, 0, 800, 600)
+        self.scrollregion = None
+        self.view_refresh_pending = None
+        self.view_refresh_forced = False
+        self.update_scrollregion()
+
+    def build_toolbar(self):
+        """Mode buttons, file actions and status labels along the bottom."""
         # Create a Frame as a container for the bottom buttons
-        self.bottom_frame = tk.Frame(root)
+        self.bottom_frame = tk.Frame(self.root)
         self.bottom_frame.pack(side=tk.BOTTOM, fill=tk.X)
 
         # Mode buttons
@@ -200,35 +2602,75 @@ class VectorGraphicEditor:
         multiselect_button = tk.Button(self.bottom_frame, text="Multiselect", command=lambda: self.set_mode("multiselect"))
         multiselect_button.pack(side=tk.LEFT)
 
+        stamp_button = tk.Button(self.bottom_frame, text="Stamp Mode", command=lambda: self.set_mode("stamp"))
+        stamp_button.pack(side=tk.LEFT)
+
+        open_button = tk.Button(self.bottom_frame, text="Open", command=self.open_document)
+        open_button.pack(side=tk.LEFT)
+
+        svg_button = tk.Button(self.bottom_frame, text="Import SVG", command=self.import_svg)
+        svg_button.pack(side=tk.LEFT)
+
+        save_button = tk.Button(self.bottom_frame, text="Save", command=self.save_document)
+        save_button.pack(side=tk.LEFT)
+
+        export_button = tk.Button(self.bottom_frame, text="Export PNG", command=self.export_png)
+        export_button.pack(side=tk.LEFT)
+
+        undo_button = tk.Button(self.bottom_frame, text="Undo", command=self.undo)
+        undo_button.pack(side=tk.LEFT)
+
+        redo_button = tk.Button(self.bottom_frame, text="Redo", command=self.redo)
+        redo_button.pack(side=tk.LEFT)
+
+        self.root.bind("<Control-z>", lambda e: self.undo())
+        self.root.bind("<Control-y>", lambda e: self.redo())
+        self.root.bind("<Control-Shift-Z>", lambda e: self.redo())
+        self.root.bind("<Control-bracketright>", lambda e: self.bring_forward())
+        self.root.bind("<Control-bracketleft>", lambda e: self.send_backward())
+        self.root.bind("<Control-Shift-braceright>", lambda e: self.bring_to_front())
+        self.root.bind("<Control-Shift-braceleft>", lambda e: self.send_to_back())
+        self.root.bind("<Control-g>", lambda e: self.group_selection())
+        self.root.bind("<Control-Shift-G>", lambda e: self.ungroup_selection())
+        self.root.bind("<F12>", lambda e: self.toggle_instrumentation())
+        self.root.bind("<Shift-F12>", lambda e: self.dump_stats())
+
         # Mode label at the bottom-right
         self.mode_label = tk.Label(self.bottom_frame, text=f"Mode: {self.mode}", bd=1, relief=tk.SUNKEN, anchor=tk.W)
         self.mode_label.pack(side=tk.RIGHT, fill=tk.X)
 
-        # Create a Frame as a container for the right column
-        self.right_column_frame = tk.Frame(root, bg="lightgray", relief=tk.SOLID)
-        self.right_column_frame.pack(side=tk.RIGHT, fill=tk.Y)
+        self.latency_label = tk.Label(self.bottom_frame, text=self.drag_latency.report(), bd=1, relief=tk.SUNKEN, anchor=tk.W)
+        self.latency_label.pack(side=tk.RIGHT, fill=tk.X)
+
+    def build_property_panel(self):
+        """Right column showing the selection and its edit buttons."""
+        # Create a Frame as a container for the right column, outside the canvas' scrollbars
+        self.right_column_frame = tk.Frame(self.root, bg="lightgray", relief=tk.SOLID)
+        self.right_column_frame.pack(side=tk.RIGHT, fill=tk.Y, before=self.x_scrollbar)
 
         # Mode label at the bottom-right
         spacer = tk.Frame(self.right_column_frame, height=80, bg='lightgray')
         spacer.pack(side=tk.TOP, fill=tk.X)
 
-        self.select_object_frame = tk.Label(self.right_column_frame, text=f"Selected Object: \nNone", bd=1, relief=tk.SUNKEN, anchor=tk.W)
-        self.select_object_frame.pack(side=tk.TOP, fill=tk.X)
+        # Selection summary and a list of the selected objects, one row each
+        summary_label = tk.Label(self.right_column_frame, text="Selected: none", bd=1, relief=tk.SUNKEN, anchor=tk.W, justify=tk.LEFT)
+        summary_label.pack(side=tk.TOP, fill=tk.X)
 
         spacer2 = tk.Frame(self.right_column_frame, height=20, bg='lightgray')
         spacer2.pack(side=tk.TOP, fill=tk.X)
-        self.select_object_color_frame = tk.Label(self.right_column_frame, text=f"Object Color: \nNone", bd=1, relief=tk.SUNKEN, anchor=tk.W)
-        self.select_object_color_frame.pack(side=tk.TOP, fill=tk.X)
-
-        spacer3 = tk.Frame(self.right_column_frame, height=20, bg='lightgray')
-        spacer3.pack(side=tk.TOP, fill=tk.X)
-        self.select_object_pos_frame = tk.Label(self.right_column_frame, text=f"Object Position: \nNone", bd=1, relief=tk.SUNKEN, anchor=tk.W)
-        self.select_object_pos_frame.pack(side=tk.TOP, fill=tk.X)
-
-        spacer3_1 = tk.Frame(self.right_column_frame, height=20, bg='lightgray')
-        spacer3_1.pack(side=tk.TOP, fill=tk.X)
-        self.select_object_z_frame = tk.Label(self.right_column_frame, text=f"Object Z-order: \nNone", bd=1, relief=tk.SUNKEN, anchor=tk.W)
-        self.select_object_z_frame.pack(side=tk.TOP, fill=tk.X)
+        list_frame = tk.Frame(self.right_column_frame, bd=1, relief=tk.SUNKEN)
+        list_frame.pack(side=tk.TOP, fill=tk.X)
+        list_scrollbar = tk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        list_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        list_canvas = tk.Canvas(list_frame, bg="white", width=330, height=SelectionInspector.rows * SelectionInspector.row_height,
+                                highlightthickness=0)
+        list_canvas.pack(side=tk.LEFT)
+
+        self.inspector = SelectionInspector(summary_label, list_canvas, list_scrollbar)
+        list_scrollbar.config(command=self.inspector.yview)
+        list_canvas.bind("<MouseWheel>", lambda e: self.inspector.scroll_by(-3 if e.delta > 0 else 3))
+        list_canvas.bind("<Button-4>", lambda e: self.inspector.scroll_by(-3))
+        list_canvas.bind("<Button-5>", lambda e: self.inspector.scroll_by(3))
 
         # Selected object color modifier
         spacer4 = tk.Frame(self.right_column_frame, height=20, bg='lightgray')
@@ -254,86 +2696,690 @@ class VectorGraphicEditor:
         self.change_position_button = tk.Button(self.right_column_frame, text="Change the Z-order", command=self.set_selected_object_z)
         self.change_position_button.pack()
 
-        # Canvas to represent the drawing area
-        self.canvas = tk.Canvas(root, bg="white", width=800, height=600)
+        # Stacking order buttons
+        spacer6 = tk.Frame(self.right_column_frame, height=20, bg='lightgray')
+        spacer6.pack(side=tk.TOP, fill=tk.X)
+        for text, command in (("Bring to front", self.bring_to_front), ("Bring forward", self.bring_forward),
+                              ("Send backward", self.send_backward), ("Send to back", self.send_to_back)):
+            tk.Button(self.right_column_frame, text=text, command=command).pack(side=tk.TOP, fill=tk.X)
+
+        # Grouping
+        spacer8 = tk.Frame(self.right_column_frame, height=20, bg='lightgray')
+        spacer8.pack(side=tk.TOP, fill=tk.X)
+        tk.Button(self.right_column_frame, text="Group", command=self.group_selection).pack(side=tk.TOP, fill=tk.X)
+        tk.Button(self.right_column_frame, text="Ungroup", command=self.ungroup_selection).pack(side=tk.TOP, fill=tk.X)
+
+        # Symbols: the selection's first object becomes (or picks) the symbol Stamp mode places
+        spacer7 = tk.Frame(self.right_column_frame, height=20, bg='lightgray')
+        spacer7.pack(side=tk.TOP, fill=tk.X)
+        tk.Button(self.right_column_frame, text="Make symbol", command=self.make_symbol).pack(side=tk.TOP, fill=tk.X)
+        tk.Button(self.right_column_frame, text="Change symbol color", command=self.set_symbol_color).pack(side=tk.TOP, fill=tk.X)
+        self.update_all_frame()  # anything selected before the panel existed
+
+    def build_canvas(self):
+        """Drawing canvas with scrollbars and its mouse bindings."""
+        # Canvas to represent the drawing area, scrollable and zoomable
+        self.x_scrollbar = tk.Scrollbar(self.root, orient=tk.HORIZONTAL)
+        self.x_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.y_scrollbar = tk.Scrollbar(self.root, orient=tk.VERTICAL)
+        self.y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.canvas = tk.Canvas(self.root, bg="white", width=800, height=600,
+                                xscrollcommand=self.x_scrollbar.set, yscrollcommand=self.y_scrollbar.set)
         self.canvas.pack(expand=tk.YES, fill=tk.BOTH)
-
-
-        self.objects = []  # List to store drawn objects
+        self.x_scrollbar.config(command=self.scroll_x)
+        self.y_scrollbar.config(command=self.scroll_y)
 
         self.canvas.bind("<ButtonPress-1>", self.on_press)
         self.canvas.bind("<B1-Motion>", self.on_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_release)
 
+        # Panning and zooming
+        self.canvas.bind("<Configure>", self.on_configure)
+        self.canvas.bind("<ButtonPress-2>", lambda e: self.canvas.scan_mark(e.x, e.y))
+        self.canvas.bind("<B2-Motion>", self.on_pan)
+        self.canvas.bind("<MouseWheel>", lambda e: self.on_wheel(e, e.delta))
+        self.canvas.bind("<Shift-MouseWheel>", lambda e: self.on_wheel(e, e.delta, horizontal=True))
+        self.canvas.bind("<Control-MouseWheel>", lambda e: self.on_wheel(e, e.delta, zoom=True))
+        self.canvas.bind("<Button-4>", lambda e: self.on_wheel(e, 120))
+        self.canvas.bind("<Button-5>", lambda e: self.on_wheel(e, -120))
+        self.canvas.bind("<Shift-Button-4>", lambda e: self.on_wheel(e, 120, horizontal=True))
+        self.canvas.bind("<Shift-Button-5>", lambda e: self.on_wheel(e, -120, horizontal=True))
+        self.canvas.bind("<Control-Button-4>", lambda e: self.on_wheel(e, 120, zoom=True))
+        self.canvas.bind("<Control-Button-5>", lambda e: self.on_wheel(e, -120, zoom=True))
+
+    def add_object(self, obj):
+        if obj is None:
+            return None
+        self.objects.append(obj)
+        self.spatial_index.insert(obj, obj.row)
+        obj.spatial_index = self.spatial_index
+        self.snap_index.add(obj.row)
+        self.store.order.add(obj)
+        if isinstance(obj, ImageObject):
+            image_cache.retain(obj)
+        if isinstance(obj, SymbolInstance):
+            obj.symbol.instances.add(obj)
+        self.extend_world_bounds(*obj.get_obj_bbox())
+        if self.store.view.overview:
+            self.schedule_view_refresh(force=True)
+        return obj
+
+    def create_object(self, obj):
+        # Add a newly created object and make it undoable
+        if self.add_object(obj) is not None:
+            self.history.record(CreateEdit([obj]))
+        return obj
+
+    def remove_objects(self, objects):
+        removed = set(objects)
+        for obj in objects:
+            obj.hide()
+            group = obj.group
+            if group is not None:
+                # Objects leaving the scene also leave their group
+                group.children.remove(obj)
+                self.store.group[obj.row] = 0
+                group.invalidate_structure()
+                self.spatial_index.update(group.root())
+            else:
+                self.spatial_index.remove(obj)
+            obj.spatial_index = None
+            self.snap_index.remove(obj.row)
+            self.store.order.discard(obj)
+            if isinstance(obj, ImageObject):
+                image_cache.release(obj)
+            if isinstance(obj, SymbolInstance):
+                obj.symbol.instances.discard(obj)
+        self.objects = [obj for obj in self.objects if obj not in removed]
+        self.selected_objects = [obj for obj in self.selected_objects if obj not in removed]
+        self.update_all_frame()
+
+    def restore_objects(self, objects):
+        with self.transaction():
+            for obj in objects:
+                self.add_object(obj)
+                obj.draw()
+        # Keep creation order, which select and multiselect use to break ties
+        self.objects.sort(key=lambda obj: obj.row)
+
+    def refresh_objects(self, objects, columns):
+        # Sync canvas items and the spatial index after the store changed under
+        # objects. Objects that are off screen before and after need no canvas work.
+        with self.transaction():
+            geometry = any(column in ('x', 'y', 'width', 'height', 'pad_x', 'pad_y') for column in columns)
+            if geometry and objects:
+                rows = self.store.rows(objects)
+                x0, y0, x1, y1 = self.store.bboxes(rows)
+                self.spatial_index.update_many(objects, x0, y0, x1, y1)
+                self.snap_index.touch(rows)
+                if len(self.store.groups) > 1:
+                    self.contents_changed(rows)
+                visible = self.store.view.contains_many(x0, y0, x1, y1)
+                for obj, seen in zip(objects, visible.tolist()):
+                    if seen or obj.item_id is not None:
+                        obj.update_coords()
+                self.extend_world_bounds(float(x0.min()), float(y0.min()), float(x1.max()), float(y1.max()))
+            if 'color' in columns or 'text' in columns or 'font_size' in columns:
+                for obj in objects:
+                    if obj.item_id is not None:
+                        obj.update_style()
+            if 'z' in columns:
+                self.restack_objects(objects)
+            if self.selected_objects and self.inspector is not None:
+                self.inspector.summary.invalidate(columns)
+            self.update_all_frame()
+
+    def contents_changed(self, rows):
+        # Objects inside groups changed shape: drop the cached bounds above them
+        for gid in np.unique(self.store.group[rows]).tolist():
+            if gid:
+                group = self.store.groups[gid]
+                group.invalidate()
+                self.spatial_index.update(group.root())
+
+    def refresh_groups(self, groups, restyle=False):
+        # The transforms of groups changed: only the world geometry of their objects moved
+        with self.transaction():
+            for root in {group.root() for group in groups}:
+                self.spatial_index.update(root)
+            leaves = [obj for group in groups for obj in group.leaves()]
+            if leaves:
+                rows = np.concatenate([group.rows() for group in groups])
+                self.snap_index.touch(rows)
+                x0, y0, x1, y1 = self.store.bboxes(rows)
+                visible = self.store.view.contains_many(x0, y0, x1, y1)
+                for obj, seen in zip(leaves, visible.tolist()):
+                    if seen or obj.item_id is not None:
+                        obj.update_coords()
+                        if restyle:
+                            obj.update_style()  # text and images follow the group scale
+                self.extend_world_bounds(float(x0.min()), float(y0.min()), float(x1.max()), float(y1.max()))
+            if self.selected_objects and self.inspector is not None:
+                self.inspector.summary.invalidate(('x', 'y'))
+            self.update_all_frame()
+
+    ## Transactions: batched canvas updates
+    @contextmanager
+    def transaction(self):
+        """Defer canvas work inside the block, then update each touched object once.
+
+        Drawing, coordinate, style and stacking changes of objects are recorded
+        on the viewport instead of reaching the canvas; when the outermost
+        transaction ends every dirty object is created or updated once, and the
+        selection panel is refreshed once. Transactions nest.
+        """
+        view = self.store.view
+        if view.pending is not None:
+            yield
+            return
+        view.pending = {}
+        self.frames_pending = False
+        try:
+            yield
+        finally:
+            pending, view.pending = view.pending, None
+            self.flush(pending)
+            if self.frames_pending:
+                self.update_all_frame()
+
+    def flush(self, pending):
+        view = self.store.view
+        # Objects removed (or from a closed scene) during the transaction are skipped
+        live = [obj for obj in pending if obj.store is self.store and obj in self.store.order]
+        # Bottom first, so new items created together mostly land in order on top
+        live.sort(key=self.store.order.keys.__getitem__)
+        # Stacking first, bottom up, so new items below can be placed against it
+        moved = [obj for obj in live if pending[obj] & view.RESTACK and obj.item_id is not None and view.shown.update(obj)]
+        moved.sort(key=view.shown.keys.__getitem__)
+        for obj in moved:
+            view.place(obj)
+        for obj in live:
+            change = pending[obj]
+            if change & view.DRAW:
+                obj.draw()
+            elif change & view.COORDS:
+                obj.update_coords()
+                if change & view.STYLE and obj.item_id is not None:
+                    obj.update_style()
+            elif change & view.STYLE:
+                obj.update_style()
+
+    def undo(self):
+        self.history.undo(self)
+
+    def redo(self):
+        self.history.redo(self)
+
     def draw_by_z_order(self):
-        # Sorting based on z value
-        sorted_objects = sorted(self.objects, key=lambda obj: obj.get_obj_z())
+        # Stacking follows z as objects change (see restack_objects); this
+        # re-applies the whole order, moving only items that are off one
+        # longest correctly stacked run
+        shown = list(self.store.view.shown)
+        stacked = {item: i for i, item in enumerate(self.canvas.find_withtag("graphic_object"))}
+        ranks = [stacked.get(obj.item_id, -1) for obj in shown]
+        if all(a < b for a, b in zip(ranks, ranks[1:])):
+            return
+
+        keep = longest_increasing_run(ranks)
+        below = None
+        for i, obj in enumerate(shown):
+            if i not in keep:
+                if below is None:
+                    self.canvas.tag_lower(obj.item_id)
+                else:
+                    self.canvas.tag_raise(obj.item_id, below.item_id)
+            below = obj
+
+    def restack_objects(self, objects):
+        # Refile objects whose z changed; the transaction then moves just their
+        # canvas items, bottom first, each directly above the shown object below it
+        with self.transaction():
+            for obj in objects:
+                obj.order_changed()
+
+    ## Groups
+    def selection_parts(self):
+        # Selected objects and selected groups, apart
+        objects = [obj for obj in self.selected_objects if not isinstance(obj, Group)]
+        groups = [obj for obj in self.selected_objects if isinstance(obj, Group)]
+        return objects, groups
+
+    def selection_leaves(self):
+        # The selected objects, with groups replaced by every object below them.
+        # The same list is returned while neither the selection nor its groups'
+        # members change, so the inspector keeps its summary across drag steps.
+        if not any(isinstance(obj, Group) for obj in self.selected_objects):
+            return self.selected_objects
+        objects, groups = self.selection_parts()
+        parts = [group.leaves() for group in groups]
+        cached = self.leaf_selection
+        if (cached is not None and cached[0] is self.selected_objects and len(cached[1]) == len(parts)
+                and all(part is old for part, old in zip(parts, cached[1]))):
+            return cached[2]
+        leaves = objects + [obj for part in parts for obj in part]
+        self.leaf_selection = (self.selected_objects, parts, leaves)
+        return leaves
+
+    def group_selection(self):
+        # Only top-level items are selectable, so the new group is top-level too
+        if len(self.selected_objects) < 2:
+            return None
+        group = Group(self.store, self.selected_objects)
+        self.attach_group(group)
+        self.history.record(GroupEdit(group))
+        return group
+
+    def ungroup_selection(self):
+        objects, groups = self.selection_parts()
+        if not groups:
+            return
+        edits = [UngroupEdit(group, self.dissolve_group(group)) for group in groups]
+        self.history.record(edits[0] if len(edits) == 1 else CompoundEdit(edits))
+
+    def attach_group(self, group):
+        # Put a top-level group in place of its children
+        with self.transaction():
+            for child in group.children:
+                self.spatial_index.remove(child)
+                if isinstance(child, Group):
+                    child.parent = group
+                else:
+                    self.store.group[child.row] = group.id
+                    child.spatial_index = None
+            group.parent = None
+            group.invalidate_structure()
+            group.update_world()
+            self.spatial_index.insert(group)
+            if group.transform() != (0.0, 0.0, 1.0, 1.0):
+                self.refresh_groups([group], restyle=True)
+            members = set(group.children)
+            self.selected_objects = [obj for obj in self.selected_objects if obj not in members] + [group]
+            self.update_all_frame()
 
-        # Printing names in ascending order of z value
-        for obj in sorted_objects:
-            obj.draw()
+    def dissolve_group(self, group):
+        """Put a top-level group's children back at the top level, keeping them where they are.
+
+        The group's transform is baked into its direct objects' columns (the
+        scale of text into its font size) and into its subgroups' transforms;
+        returns what they were, for undo.
+        """
+        store = self.store
+        objects, subgroups = group.objects(), group.subgroups()
+        rows = store.rows(objects)
+        baked = (rows, [getattr(store, name)[rows].copy() for name in self.baked_columns],
+                 [child.transform() for child in subgroups])
+        with self.transaction():
+            store.font_size[rows] = store.world_font_sizes(rows)
+            store.x[rows] = store.x[rows] * group.sx + group.tx
+            store.y[rows] = store.y[rows] * group.sy + group.ty
+            store.width[rows] *= group.sx
+            store.height[rows] *= group.sy
+            store.group[rows] = 0
+            for obj in objects:
+                if isinstance(obj, TextObject):
+                    obj.measure()
+            for child in subgroups:
+                child.tx, child.ty = group.sx * child.tx + group.tx, group.sy * child.ty + group.ty
+                child.sx, child.sy = group.sx * child.sx, group.sy * child.sy
+                child.parent = None
+                child.update_world()
+            self.spatial_index.remove(group)
+            for child in group.children:
+                self.spatial_index.insert(child)
+                if not isinstance(child, Group):
+                    child.spatial_index = self.spatial_index
+            if objects:
+                self.refresh_objects(objects, self.baked_columns)
+            if subgroups:
+                self.refresh_groups(subgroups)
+            self.selected_objects = [obj for obj in self.selected_objects if obj is not group] + list(group.children)
+            self.update_all_frame()
+        return baked
+
+    baked_columns = ('x', 'y', 'width', 'height', 'pad_x', 'pad_y', 'font_size')
+
+    def restore_baked(self, group, baked):
+        # Undo dissolve_group's baking before the group is attached again
+        rows, columns, transforms = baked
+        for name, values in zip(self.baked_columns, columns):
+            getattr(self.store, name)[rows] = values
+        for child, transform in zip(group.subgroups(), transforms):
+            child.tx, child.ty, child.sx, child.sy = transform
+
+    ## Stacking order of the selection
+    def selection_in_order(self):
+        order = self.store.order
+        return sorted((obj for obj in self.selection_leaves() if obj in order), key=order.keys.__getitem__)
+
+    def bring_to_front(self):
+        objects = self.selection_in_order()
+        if objects:
+            top = self.store.order.last().z
+            self.set_stacking(objects, [top + 1 + i for i in range(len(objects))])
+
+    def send_to_back(self):
+        objects = self.selection_in_order()
+        if objects:
+            bottom = self.store.order.first().z
+            self.set_stacking(objects, [bottom - len(objects) + i for i in range(len(objects))])
+
+    def bring_forward(self):
+        # Topmost first, so each object sees the ones already moved
+        order = self.store.order
+        self.step_stacking(self.selection_in_order()[::-1], order.above, order.z_above)
+
+    def send_backward(self):
+        order = self.store.order
+        self.step_stacking(self.selection_in_order(), order.below, order.z_below)
+
+    def step_stacking(self, objects, neighbour, z_past):
+        # Move each object past the next unselected object (and its z ties)
+        if not objects:
+            return
+        rows = self.store.rows(objects)
+        before = self.store.z[rows].copy()
+        selected = set(objects)
+        for obj in objects:
+            other = neighbour(obj)
+            while other in selected:
+                other = neighbour(other)
+            if other is not None:
+                obj.z = z_past(other)
+                self.store.order.update(obj)
+        self.commit_stacking(objects, rows, before)
+
+    def set_stacking(self, objects, values):
+        rows = self.store.rows(objects)
+        before = self.store.z[rows].copy()
+        self.store.z[rows] = values
+        self.commit_stacking(objects, rows, before)
+
+    def commit_stacking(self, objects, rows, before):
+        self.refresh_objects(objects, ('z',))
+        self.history.record(ColumnEdit(objects, rows, ('z',), [before], [self.store.z[rows].copy()]))
+
+    ## Viewport: scrolling, zooming and culling
+    def event_pos(self, event):
+        # World coordinates of a canvas event
+        scale = self.store.view.scale
+        return self.canvas.canvasx(event.x) / scale, self.canvas.canvasy(event.y) / scale
+
+    def extend_world_bounds(self, x0, y0, x1, y1):
+        b = self.world_bounds
+        if x0 < b[0] or y0 < b[1] or x1 > b[2] or y1 > b[3]:
+            self.world_bounds = (min(b[0], x0), min(b[1], y0), max(b[2], x1), max(b[3], y1))
+            self.update_scrollregion()
+
+    def update_scrollregion(self):
+        # Scene bounds at the current zoom, padded by one window in each direction
+        scale = self.store.view.scale
+        pad_x = max(self.canvas.winfo_width(), 800)
+        pad_y = max(self.canvas.winfo_height(), 600)
+        x0, y0, x1, y1 = self.world_bounds
+        self.scrollregion = (x0 * scale - pad_x, y0 * scale - pad_y, x1 * scale + pad_x, y1 * scale + pad_y)
+        self.canvas.config(scrollregion=self.scrollregion)
+
+    def scroll_x(self, *args):
+        self.canvas.xview(*args)
+        self.schedule_view_refresh()
+
+    def scroll_y(self, *args):
+        self.canvas.yview(*args)
+        self.schedule_view_refresh()
+
+    def on_first_expose(self, event):
+        # Fires once: the canvas has been drawn, so the rest can be built behind it
+        self.canvas.unbind("<Expose>")
+        self.root.after_idle(self.build_property_panel)
+
+    def on_configure(self, event):
+        self.update_scrollregion()
+        self.schedule_view_refresh(force=True)
+
+    def on_pan(self, event):
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self.schedule_view_refresh()
+
+    def on_wheel(self, event, delta, horizontal=False, zoom=False):
+        if zoom:
+            self.zoom(1.25 if delta > 0 else 0.8, event.x, event.y)
+        elif horizontal:
+            self.scroll_x('scroll', -1 if delta > 0 else 1, 'units')
+        else:
+            self.scroll_y('scroll', -1 if delta > 0 else 1, 'units')
+
+    def zoom(self, factor, x, y):
+        # Zoom around the window point (x, y), keeping the world point under it fixed
+        view = self.store.view
+        scale = min(max(view.scale * factor, self.min_scale), self.max_scale)
+        if scale == view.scale:
+            return
+        world_x, world_y = self.canvas.canvasx(x) / view.scale, self.canvas.canvasy(y) / view.scale
+        view.scale = scale
+        self.update_scrollregion()
+        rx0, ry0, rx1, ry1 = self.scrollregion
+        self.canvas.xview_moveto((world_x * scale - x - rx0) / (rx1 - rx0))
+        self.canvas.yview_moveto((world_y * scale - y - ry0) / (ry1 - ry0))
+        self.schedule_view_refresh(force=True)
+
+    def schedule_view_refresh(self, force=False):
+        # Coalesce bursts of scroll / zoom events into one refresh per idle pass
+        self.view_refresh_forced = self.view_refresh_forced or force
+        if self.view_refresh_pending is None:
+            self.view_refresh_pending = self.root.after_idle(self.refresh_view)
+
+    def visible_rect(self):
+        scale = self.store.view.scale
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        return (self.canvas.canvasx(0) / scale, self.canvas.canvasy(0) / scale,
+                self.canvas.canvasx(width) / scale, self.canvas.canvasy(height) / scale)
+
+    def refresh_view(self):
+        force = self.view_refresh_forced
+        self.view_refresh_pending = None
+        self.view_refresh_forced = False
+        view = self.store.view
+        x0, y0, x1, y1 = self.visible_rect()
+        if not force and view.rect is not None and not view.overview:
+            r = view.rect
+            if x0 >= r[0] and y0 >= r[1] and x1 <= r[2] and y1 <= r[3]:
+                return  # still inside the culled region kept around the view
+
+        mx, my = (x1 - x0) * view.margin, (y1 - y0) * view.margin
+        view.rect = (x0 - mx, y0 - my, x1 + mx, y1 + my)
+        if self.spatial_index.estimate_count(*view.rect, self.max_live_items) > self.max_live_items:
+            self.show_overview(x0, y0, x1, y1)
+            return
+
+        if view.overview:
+            view.overview = False
+            self.canvas.delete("overview")
+        visible = set()
+        for obj in self.spatial_index.intersecting(*view.rect):
+            if isinstance(obj, Group):
+                visible.update(obj.leaves_in(*view.rect))
+            else:
+                visible.add(obj)
+        for obj in list(view.shown):
+            if obj not in visible:
+                obj.hide()
+        for obj in visible:
+            if force or obj.item_id is None:
+                obj.draw()
+
+    def show_overview(self, x0, y0, x1, y1):
+        # Too many objects in view: draw one tile per occupied grid area instead
+        view = self.store.view
+        view.overview = True
+        for obj in list(view.shown):
+            obj.hide()
+        self.canvas.delete("overview")
+
+        scale = view.scale
+        cell = self.spatial_index.cell_size
+        tile = max(self.overview_tile_size, cell * scale)
+        c0, r0 = self.spatial_index.cell_of(x0, y0)
+        c1, r1 = self.spatial_index.cell_of(x1, y1)
+        tiles = set()
+        for c, r in self.spatial_index.cells:
+            if c0 <= c <= c1 and r0 <= r <= r1:
+                tiles.add((math.floor(c * cell * scale / tile), math.floor(r * cell * scale / tile)))
+        for tx, ty in tiles:
+            self.canvas.create_rectangle(tx * tile, ty * tile, (tx + 1) * tile, (ty + 1) * tile,
+                                         fill='gray60', outline='', tags="overview")
+        for obj in self.spatial_index.oversized:
+            bx0, by0, bx1, by1 = view.to_view(*obj.get_obj_bbox())
+            self.canvas.create_rectangle(bx0, by0, bx1, by1, outline='gray40', tags="overview")
+
+    def drag_selection(self, event):
+        # Move the selection with the pointer, its edges and center snapping to
+        # other objects'; the steps of one drag form one undo entry
+        if self.drag_box is None:
+            return
+        cur_x, cur_y = self.event_pos(event)
+        dx, dy = cur_x - self.start_x, cur_y - self.start_y
+        x0, y0, x1, y1 = self.drag_box
+        snap_x, snap_y = self.snap((x0 + dx, (x0 + x1) / 2 + dx, x1 + dx),
+                                   (y0 + dy, (y0 + y1) / 2 + dy, y1 + dy), self.drag_excluded)
+        dx += snap_x[0] if snap_x else 0
+        dy += snap_y[0] if snap_y else 0
+        step_x, step_y = dx - self.drag_offset[0], dy - self.drag_offset[1]
+        self.drag_offset = (dx, dy)
+        if step_x == 0 and step_y == 0:
+            return
+        edit = MoveEdit(self.drag_objects, self.drag_rows, step_x, step_y, self.drag_groups)
+        edit.redo(self)
+        self.history.record(edit, merge_key=('drag', self.drag_count))
 
     def draw_object_drag(self, event):
-        cur_x = self.canvas.canvasx(event.x)
-        cur_y = self.canvas.canvasy(event.y)
+        # Preview items live in canvas (zoomed) coordinates
+        cur_x, cur_y = self.store.view.to_view(*self.snapped_pos(event))
+        start_x, start_y = self.store.view.to_view(self.start_x, self.start_y)
 
         if self.current_object:
-            self.canvas.delete(self.current_object)
+            self.canvas.coords(self.current_object, start_x, start_y, cur_x, cur_y)
         
-        if self.mode == 'rectangle':
+        elif self.mode == 'rectangle':
             self.current_object = self.canvas.create_rectangle(
-                self.start_x, self.start_y, cur_x, cur_y, fill=self.color, outline=self.color
+                start_x, start_y, cur_x, cur_y, fill=self.color, outline=self.color
             )
         
         elif self.mode == 'ellipse':
             self.current_object = self.canvas.create_oval(
-                self.start_x, self.start_y, cur_x, cur_y, fill=self.color, outline=self.color
+                start_x, start_y, cur_x, cur_y, fill=self.color, outline=self.color
             )
         elif self.mode == 'line':
             self.current_object = self.canvas.create_line(
-                self.start_x, self.start_y, cur_x, cur_y, fill=self.color, width=5
+                start_x, start_y, cur_x, cur_y, fill=self.color, width=max(1, 5 * self.store.view.scale)
             )
 
         elif self.mode == 'multiselect':
             self.current_object = self.canvas.create_rectangle(
-                self.start_x, self.start_y, cur_x, cur_y, outline='black',dash=(2, 2)
+                start_x, start_y, cur_x, cur_y, outline='black',dash=(2, 2)
             )
 
 
     def draw_object_release(self,event):
         
-        cur_x = self.canvas.canvasx(event.x)
-        cur_y = self.canvas.canvasy(event.y)
+        cur_x, cur_y = self.snapped_pos(event)
 
-        if self.current_object:
-            self.canvas.delete(self.current_object)
+        self.remove_drag_preview()
         
         # Draw an ellipse, rectangle, or line based on the starting and current points
 
-        self.objects.append(
-            GraphicObjectFactory().create_graphic_object(self.canvas, self.start_x, self.start_y, cur_x, cur_y, self.color, self.mode)
-        )
+        with self.transaction():
+            self.create_object(
+                GraphicObjectFactory().create_graphic_object(self.canvas, self.start_x, self.start_y, cur_x, cur_y, self.color, self.mode)
+            )
 
     def on_press(self, event):
-        self.start_x = self.canvas.canvasx(event.x)
-        self.start_y = self.canvas.canvasy(event.y)
+        self.start_x, self.start_y = self.event_pos(event)
+        self.button_down = True
+        self.drag_latency.clear()  # the label reports each drag on its own
+        if self.snap_distance:
+            self.snap_index.prepare()  # merge in what changed since the last drag
+
+        if self.mode in ('rectangle', 'ellipse', 'line', 'multiselect'):
+            self.start_x, self.start_y = self.snapped_pos(event)
 
         if self.mode == 'select':
-            self.select_object(event)
+            # Pressing on the selection keeps it, so a multiselection can be dragged
+            if not self.selection_hit(self.start_x, self.start_y):
+                self.select_object(event)
+            self.drag_count += 1
+            self.drag_offset = (0, 0)
+            if self.selection_hit(self.start_x, self.start_y):
+                self.drag_objects, self.drag_groups = self.selection_parts()
+                self.drag_rows = self.store.rows(self.drag_objects)
+                self.start_drag_snapping()
+            else:
+                # A press beside every object selects the nearest one but moves nothing
+                self.drag_objects, self.drag_groups = [], []
+                self.drag_rows = self.store.rows([])
+                self.drag_box = None
 
         if self.mode == 'text':
             self.insert_text(event)
+
+        if self.mode == 'stamp' and self.current_symbol is not None:
+            self.place_instance(self.current_symbol, self.start_x, self.start_y)
         
     
     def on_drag(self, event):
-        if self.mode == 'rectangle' or self.mode == 'ellipse' or self.mode == 'line' or self.mode == 'multiselect':
+        if self.mode == 'rectangle' or self.mode == 'ellipse' or self.mode == 'line' or self.mode == 'multiselect' or self.mode == 'select':
+            self.queue_drag(event)
+
+    def queue_drag(self, event):
+        # Keep only the newest motion event; apply it at the next frame boundary
+        arrived = self.pending_drag[1] if self.pending_drag else self.drag_latency.event_time(event)
+        self.pending_drag = (event, arrived)
+        if self.drag_flush_id is None:
+            elapsed_ms = (time.perf_counter() - self.last_drag_flush) * 1000
+            delay = max(0, round(self.frame_ms - elapsed_ms))
+            self.drag_flush_id = self.root.after(delay, self.flush_drag)
+
+    def flush_drag(self):
+        self.drag_flush_id = None
+        if self.pending_drag is None:
+            return
+        event, arrived = self.pending_drag
+        self.pending_drag = None
+        self.last_drag_flush = time.perf_counter()
+        if self.mode == 'select':
+            self.drag_selection(event)
+        else:
             self.draw_object_drag(event)
+        # Idle callbacks run in order, so this fires after Tk has redrawn the canvas
+        self.root.after_idle(self.record_drag_latency, arrived)
+
+    def record_drag_latency(self, arrived):
+        self.drag_latency.add((time.perf_counter() - arrived) * 1000)
+
+    def cancel_drag_flush(self):
+        # The release event carries the final position, so queued motion is dropped
+        if self.drag_flush_id is not None:
+            self.root.after_cancel(self.drag_flush_id)
+            self.drag_flush_id = None
+        self.pending_drag = None
+
+    def remove_drag_preview(self):
+        if self.current_object:
+            self.canvas.delete(self.current_object)
+        self.current_object = None
 
     def on_release(self, event):
+        self.button_down = False
+        self.cancel_drag_flush()
+        self.latency_label.config(text=self.drag_latency.report())
+
         if self.mode == 'rectangle' or self.mode == 'ellipse' or self.mode == 'line':
             self.draw_object_release(event)
         elif self.mode == 'multiselect':
             self.multiselect_object(event)
+        elif self.mode == 'select':
+            self.drag_selection(event)
+        self.show_guides(None, None)
 
     def set_mode(self, mode):
         self.mode = mode
@@ -345,10 +3391,12 @@ class VectorGraphicEditor:
         self.modify_mode = 'color'
 
         self.choose_color()
-        for obj in self.selected_objects:
-            obj.set_obj_color(self.color)
-
-        self.draw_by_z_order()
+        objects = self.selection_leaves()
+        rows = self.store.rows(objects)
+        edit = ColumnEdit(objects, rows, ('color',),
+                          [self.store.color[rows].copy()], [self.store.color_code(self.color)])
+        edit.redo(self)
+        self.history.record(edit)
 
     def choose_color(self):
         self.color = colorchooser.askcolor()[1]
@@ -356,41 +3404,95 @@ class VectorGraphicEditor:
     ## Select one object
     def select_object(self, event=None):
         self.mode = 'select'
-        x, y = event.x, event.y
-        self.selected_objects = [self.find_closest(x, y)]
+        x, y = self.event_pos(event)
+        closest = self.find_closest(x, y)
+        self.selected_objects = [closest] if closest is not None else []
         self.update_all_frame()
 
     def find_closest(self, x, y):
-        closest_object = None
-        min_distance = float('inf')
-
-        for obj in self.objects:
-            obj_x, obj_y = obj.get_obj_center()
-            distance = math.sqrt((x - obj_x)**2 + (y - obj_y)**2)
-
-            if distance < min_distance:
-                min_distance = distance
-                closest_object = obj
-
-        return closest_object
+        return self.spatial_index.nearest_center(x, y)
+
+    def selection_hit(self, x, y):
+        # Whether (x, y) is on a selected object, or within hit_distance of one
+        pad = self.hit_distance / self.store.view.scale
+        objects, groups = self.selection_parts()
+        for group in groups:
+            x0, y0, x1, y1 = group.get_obj_bbox()
+            if x0 - pad <= x <= x1 + pad and y0 - pad <= y <= y1 + pad:
+                return True
+        if not objects:
+            return False
+        x0, y0, x1, y1 = self.store.bboxes(self.store.rows(objects))
+        return bool(((x0 - pad <= x) & (x <= x1 + pad) & (y0 - pad <= y) & (y <= y1 + pad)).any())
     
 
+    ## Snapping
+    def start_drag_snapping(self):
+        # Bounds of what the drag moves, and its rows, left out of the snap targets
+        boxes = [group.get_obj_bbox() for group in self.drag_groups]
+        if len(self.drag_rows):
+            boxes.append(self.store.bbox(self.drag_rows))
+        if not boxes:
+            self.drag_box = None
+            return
+        self.drag_box = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                         max(b[2] for b in boxes), max(b[3] for b in boxes))
+        rows = [self.drag_rows] + [group.rows() for group in self.drag_groups]
+        self.drag_excluded = self.snap_index.mask(np.concatenate(rows))
+
+    def snap(self, xs, ys, excluded=None):
+        # Nearest alignment of any of xs / ys with other objects, as SnapIndex.nearest
+        # results, and show guides at the coordinates they snap to
+        if not self.snap_distance:
+            return None, None
+        tolerance = self.snap_distance / self.store.view.scale
+        snap_x = self.snap_index.nearest(0, xs, tolerance, excluded)
+        snap_y = self.snap_index.nearest(1, ys, tolerance, excluded)
+        self.show_guides(snap_x and snap_x[1], snap_y and snap_y[1])
+        return snap_x, snap_y
+
+    def snapped_pos(self, event):
+        # World position of a pointer event, pulled onto nearby edges and centers
+        x, y = self.event_pos(event)
+        snap_x, snap_y = self.snap((x,), (y,))
+        return snap_x[1] if snap_x else x, snap_y[1] if snap_y else y
+
+    def show_guides(self, x, y):
+        # Alignment guides across the visible canvas at world x and y; None hides one
+        if self.guide_items is None:
+            if x is None and y is None:
+                return
+            self.guide_items = tuple(self.canvas.create_line(0, 0, 0, 0, fill='#ff00ff', dash=(4, 2), state=tk.HIDDEN)
+                                     for _ in range(2))
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        right, bottom = self.canvas.canvasx(self.canvas.winfo_width()), self.canvas.canvasy(self.canvas.winfo_height())
+        scale = self.store.view.scale
+        for axis, at, coords in ((0, x, lambda v: (v, top, v, bottom)), (1, y, lambda v: (left, v, right, v))):
+            shown_at = self.guide_positions[axis]
+            if at == shown_at:
+                continue
+            self.guide_positions[axis] = at
+            item = self.guide_items[axis]
+            if at is None:
+                self.canvas.itemconfig(item, state=tk.HIDDEN)
+                continue
+            self.canvas.coords(item, *coords(at * scale))
+            if shown_at is None:
+                self.canvas.itemconfig(item, state=tk.NORMAL)
+                self.canvas.tag_raise(item)
+
     ## Multiselect objects
     def multiselect_object(self, event=None):
-        cur_x, cur_y = event.x, event.y
+        cur_x, cur_y = self.snapped_pos(event)
         self.selected_objects = []
         min_x = min(cur_x, self.start_x)
         max_x = max(cur_x, self.start_x)
         min_y = min(cur_y, self.start_y)
         max_y = max(cur_y, self.start_y)
 
-        if self.current_object: # Remove existing boundary box
-            self.canvas.delete(self.current_object)
+        self.remove_drag_preview() # Remove existing boundary box
 
-        for obj in self.objects :
-            obj_x, obj_y = obj.get_obj_center()
-            if obj_x >= min_x and obj_x <= max_x and obj_y >= min_y and obj_y <= max_y :
-                self.selected_objects.append(obj)
+        self.selected_objects = self.spatial_index.centers_in_rect(min_x, min_y, max_x, max_y)
         
         self.update_all_frame()
 
@@ -412,13 +3514,315 @@ class VectorGraphicEditor:
         submit_button.pack()
 
     def insert_image(self):
-        # Ask the user to select an image file
-        image_path = filedialog.askopenfilename(initialdir="/", title="Select An Image", filetypes=(("jpeg files", "*.jpg"), ("gif files", "*.gif*"), ("png files", "*.png")))
-        if image_path:
-            self.current_object = GraphicObjectFactory().create_graphic_object(
-                self.canvas, 0, 0, None, None, None, "image", image_path=image_path
-            )
-            self.objects.append(self.current_object)
+        # Ask the user to select one or more image files
+        image_paths = filedialog.askopenfilenames(initialdir="/", title="Select Images", filetypes=(("image files", "*.jpg *.jpeg *.gif *.png *.bmp"), ("jpeg files", "*.jpg"), ("gif files", "*.gif*"), ("png files", "*.png")))
+        if image_paths:
+            self.import_images(image_paths)
+
+    def import_images(self, paths, x=0, y=0, columns=10):
+        # Placeholders appear at once, in a grid; the files are decoded in the background
+        cell = self.placeholder_size * 1.25
+        size = (self.placeholder_size, self.placeholder_size)
+        with self.transaction():
+            objects = [self.add_object(ImageObject(self.canvas, x + i % columns * cell, y + i // columns * cell, path, size=size))
+                       for i, path in enumerate(paths)]
+        if not objects:
+            return objects
+        edit = CreateEdit(objects)
+        self.history.record(edit)
+        for path, obj in zip(paths, objects):
+            self.loading_images.setdefault(path, []).append((obj, edit))
+            self.image_loader.load(path)
+        return objects
+
+    def image_loaded(self, path, digest, error):
+        # A file finished decoding: show it in its placeholders at its natural size
+        waiting = self.loading_images.pop(path, [])
+        if error is not None:
+            # Drop the placeholders, also from the undo history, and report once the import is done
+            for obj, edit in waiting:
+                edit.objects.remove(obj)
+            shown = [obj for obj, _ in waiting if obj.store is self.store and obj in self.store.order]
+            self.remove_objects(shown)
+            if shown and self.autosave is not None:
+                self.autosave.removed(shown)
+            self.failed_images.append(f"{os.path.basename(path)}: {error}")
+            if not self.loading_images:
+                messagebox.showwarning("", "Cannot open images:\n" + "\n".join(self.failed_images[:20]))
+                self.failed_images = []
+            return
+        width, height = image_cache.size(digest)
+        shown = []
+        for obj, _ in waiting:
+            obj.image_key = digest
+            obj.store.width[obj.row] = width
+            obj.store.height[obj.row] = height
+            # Placeholders that were undone or belong to a closed document only need the data
+            if obj.store is self.store and obj in self.store.order:
+                image_cache.retain(obj)  # added as a placeholder, before it had a key
+                shown.append(obj)
+        if shown:
+            self.refresh_objects(shown, ('width', 'height'))
+            if self.autosave is not None:
+                self.autosave.resized(shown)  # the journal has them at the placeholder size
+
+    ## Symbols
+    def make_symbol(self):
+        # The first selected object becomes the definition and is replaced by
+        # its first instance; selecting an instance picks its symbol instead
+        if not self.selected_objects:
+            return None
+        obj = self.selected_objects[0]
+        if isinstance(obj, Group):
+            return None  # symbols are single shapes
+        if isinstance(obj, SymbolInstance):
+            self.current_symbol = obj.symbol
+            return obj.symbol
+        try:
+            symbol = Symbol.from_object(obj)
+        except OSError as e:
+            messagebox.showwarning("", f"Cannot read image:\n{e}")
+            return None
+        with self.transaction():
+            instance = symbol.instantiate(self.canvas, obj.x, obj.y, obj.width, obj.height, obj.color)
+            instance.set_z_order(obj.z)
+            self.remove_objects([obj])
+            self.add_object(instance)
+            self.selected_objects = [instance]
+            self.update_all_frame()
+        self.history.record(ReplaceEdit([obj], [instance]))
+        self.current_symbol = symbol
+        return symbol
+
+    def place_instance(self, symbol, x, y):
+        with self.transaction():
+            instance = self.create_object(symbol.instantiate(self.canvas, x, y))
+        return instance
+
+    def live_instances(self, symbol):
+        # Instances on the scene, in creation order
+        return sorted(symbol.instances, key=lambda obj: obj.row)
+
+    def edit_symbol(self, symbol, color=None, width=None, height=None, text=None):
+        """Redefine a symbol and update all of its instances in one batched pass.
+
+        Instance sizes keep their scale relative to the symbol, instances that
+        had the symbol's color take the new one, and a new text is measured
+        once for all of them.
+        """
+        objects = self.live_instances(symbol)
+        rows = self.store.rows(objects)
+        store = self.store
+        columns, before, after = [], [], []
+        old, new = {}, {}
+
+        def change(column, values):
+            columns.append(column)
+            before.append(getattr(store, column)[rows].copy())
+            after.append(values)
+
+        if color is not None and color != symbol.color:
+            values = store.color[rows].copy()
+            values[values == store.color_code(symbol.color)] = store.color_code(color)
+            change('color', values)
+            old['color'], new['color'] = symbol.color, color
+        for column, size in (('width', width), ('height', height)):
+            base = getattr(symbol, column)
+            if size is None or size == base:
+                continue
+            change(column, getattr(store, column)[rows] * (size / base) if base else np.full(len(rows), float(size)))
+            old[column], new[column] = base, size
+        if text is not None and text != symbol.text and symbol.kind == 'text':
+            # Measured once per font size among the instances
+            sizes = store.font_size[rows].tolist()
+            extents = {size: text_layouts.extent(text, TextObject.font_family, size) for size in set(sizes)}
+            change('pad_x', np.array([extents[size][0] for size in sizes]) * 0.5)
+            change('pad_y', np.array([extents[size][1] for size in sizes]) * 0.5)
+            old['text'], new['text'] = symbol.text, text
+        if not new:
+            return None
+        edit = SymbolEdit(symbol, objects, rows, tuple(columns), before, after, old, new)
+        edit.redo(self)
+        self.history.record(edit)
+        return edit
+
+    def set_symbol_color(self):
+        # Recolor the symbol of the first selected instance, or the current symbol
+        symbol = self.current_symbol
+        if self.selected_objects and isinstance(self.selected_objects[0], SymbolInstance):
+            symbol = self.selected_objects[0].symbol
+        if symbol is None:
+            return
+        color = colorchooser.askcolor()[1]
+        if color:
+            self.edit_symbol(symbol, color=color)
+
+    ## Documents
+    def save_document(self, path=None):
+        if path is None:
+            path = filedialog.asksaveasfilename(title="Save Document", defaultextension=document.EXTENSION, filetypes=(("documents", "*" + document.EXTENSION),))
+        if path:
+            # Groups are flattened: objects are saved where they appear
+            store = journal.FrozenStore(self.store, self.store.rows(self.objects))
+            document.save(path, self.objects, self.canvas.winfo_width(), self.canvas.winfo_height(), store=store)
+
+    def open_document(self, path=None):
+        if path is None:
+            path = filedialog.askopenfilename(title="Open Document", filetypes=(("documents", "*" + document.EXTENSION),))
+        if not path:
+            return
+        try:
+            doc = document.Document(path)
+        except (OSError, ValueError) as e:
+            messagebox.showwarning("", f"Cannot open document:\n{e}")
+            return
+
+        self.clear_scene()
+        self.history.clear()
+        self.document_load = doc
+        self.load_chunks(doc, doc.chunks())
+
+    def load_chunks(self, doc, chunks, failed=0):
+        # Stream the record table in chunks so the UI stays live while loading
+        if doc is not self.document_load:
+            doc.close()  # the scene was cleared, or another document opened, under the load
+            return
+        try:
+            chunk = next(chunks, None)
+            records = [] if chunk is None else list(doc.decode(chunk))
+        except (OSError, ValueError) as e:
+            chunk = None
+            messagebox.showwarning("", f"Document load stopped:\n{e}")
+        if chunk is None:
+            doc.close()
+            self.document_load = None
+            if failed:
+                messagebox.showwarning("", f"Skipped {failed} objects that could not be loaded")
+            return
+        factory = GraphicObjectFactory()
+        with self.transaction():
+            for record in records:
+                try:
+                    obj = factory.create_from_record(self.canvas, record)
+                except (OSError, ValueError):
+                    failed += 1  # e.g. a corrupt embedded image
+                    continue
+                self.add_object(obj)
+        self.root.after(1, self.load_chunks, doc, chunks, failed)
+
+    def import_svg(self, path=None):
+        import svg
+        if path is None:
+            path = filedialog.askopenfilename(title="Import SVG", filetypes=(("svg files", "*" + svg.EXTENSION),))
+        if not path:
+            return
+        if self.svg_import is not None:
+            messagebox.showwarning("", "An SVG import is already running")
+            return
+        try:
+            importer = svg.Importer(path)
+        except OSError as e:
+            messagebox.showwarning("", f"Cannot open SVG:\n{e}")
+            return
+        self.svg_import = importer
+        self.import_svg_batches(importer, importer.batches(), CreateEdit([]))
+
+    def import_svg_batches(self, importer, batches, edit):
+        # One batch of records per event-loop turn, each drawn once when its transaction ends
+        if importer is not self.svg_import:
+            importer.close()  # the scene was cleared under the import
+            return
+        try:
+            batch = next(batches, None)
+        except ValueError as e:
+            batch = None
+            messagebox.showwarning("", f"SVG import stopped:\n{e}")
+        if batch is None:
+            self.finish_svg_import(importer, edit)
+            return
+        factory = GraphicObjectFactory()
+        size = (self.placeholder_size, self.placeholder_size)
+        try:
+            with self.transaction():
+                for record in batch:
+                    try:
+                        if record['type'] == 'image' and record.get('image_path'):
+                            # Linked files are decoded in the background like inserted images
+                            obj = self.add_object(ImageObject(self.canvas, record['x'], record['y'], record['image_path'], size=size))
+                            self.loading_images.setdefault(obj.image_path, []).append((obj, edit))
+                            self.image_loader.load(obj.image_path)
+                        else:
+                            obj = self.add_object(factory.create_from_record(self.canvas, record))
+                    except (OSError, ValueError):
+                        importer.skipped += 1  # e.g. an embedded image that does not decode
+                        continue
+                    edit.objects.append(obj)
+        except Exception:
+            # Keep what was added undoable and let later imports run
+            self.finish_svg_import(importer, edit)
+            raise
+        self.update_mode_label()
+        self.root.after(1, self.import_svg_batches, importer, batches, edit)
+
+    def finish_svg_import(self, importer, edit):
+        importer.close()
+        self.svg_import = None
+        if edit.objects:
+            self.history.record(edit)
+        self.update_mode_label()
+        if importer.skipped:
+            messagebox.showinfo("", f"Imported {len(edit.objects)} objects; skipped {importer.skipped} unsupported or unreadable elements")
+
+    def clear_scene(self):
+        for obj in self.objects:
+            if obj.item_id is not None:
+                self.canvas.delete(obj.item_id)
+            if isinstance(obj, ImageObject):
+                image_cache.release(obj)
+            if isinstance(obj, SymbolInstance):
+                obj.symbol.instances.discard(obj)
+        self.objects = []
+        self.selected_objects = []
+        self.loading_images = {}
+        self.failed_images = []
+        self.svg_import = None  # a running import stops at its next batch
+        self.document_load = None  # and so does a document load
+        self.current_symbol = None
+        if self.autosave is not None:
+            self.autosave.scene_changed()
+        self.canvas.delete("overview")
+        self.store = SceneStore.reset(self.canvas)
+        self.spatial_index = SpatialIndex()
+        self.snap_index = SnapIndex(self.store)
+        self.world_bounds = (0, 0, 800, 600)
+        self.update_scrollregion()
+        self.update_all_frame()
+
+    def export_png(self):
+        # Rasterize the scene with the headless renderer
+        path = filedialog.asksaveasfilename(title="Export PNG", defaultextension=".png", filetypes=(("png files", "*.png"),))
+        if path:
+            import renderer
+            width = max(self.canvas.winfo_width(), renderer.CANVAS_WIDTH)
+            height = max(self.canvas.winfo_height(), renderer.CANVAS_HEIGHT)
+            renderer.render_objects(self.objects, width, height).save(path)
+
+    ## Autosave
+    def enable_autosave(self, directory=journal.DEFAULT_DIRECTORY):
+        self.autosave = Autosave(self, directory)
+        self.autosave.start()
+
+    ## Instrumentation
+    def toggle_instrumentation(self):
+        if self.instrumentation.enabled:
+            self.instrumentation.disable()
+        else:
+            self.instrumentation.enable()
+
+    def dump_stats(self):
+        path = filedialog.asksaveasfilename(title="Save stats", defaultextension=".json", filetypes=(("json files", "*.json"),))
+        if path:
+            self.instrumentation.dump(path)
 
     ## modifying the size of selected object
     def set_selected_object_size(self):
@@ -496,7 +3900,6 @@ class VectorGraphicEditor:
             window.destroy()
 
             # Update view 
-            self.draw_by_z_order()
             self.update_all_frame()
 
     def get_numbers(self, num1, num2):
@@ -507,27 +3910,53 @@ class VectorGraphicEditor:
         except ValueError:
             messagebox.showwarning("", "Invalid Input")
             return False
-        
-        for obj in self.selected_objects:
 
-            if self.modify_mode == 'position' :
-                obj.set_obj_pos(num1, num2)
-
-            elif self.modify_mode == 'size':
-                obj.set_obj_size(num1,num2)
-            
-            elif self.modify_mode == 'z-order':
-                obj.set_z_order(num1)
-            
+        if not (math.isfinite(num1) and math.isfinite(num2)):
+            # nan and inf parse as floats, but no position, size or z-order can hold them
+            messagebox.showwarning("", "Invalid Input")
+            return False
+        
+        # Apply the edit to the whole selection at once, recording the old columns for undo.
+        # Selected groups are placed or resized through their transform.
+        objects, groups = self.selection_parts()
+        if self.modify_mode == 'position' :
+            columns, values = ('x', 'y'), [num1, num2]
+            transforms = [group.placed(num1, num2) for group in groups]
+
+        elif self.modify_mode == 'size':
+            if num1 <= 0 or num2 <= 0:
+                groups = []  # group scales stay positive
+            columns, values = ('width', 'height'), [num1, num2]
+            transforms = [group.resized(num1, num2) for group in groups]
+        
+        elif self.modify_mode == 'z-order':
+            objects, groups = self.selection_leaves(), []
+            columns, values = ('z',), [num1]
+
+        else:
+            return True
+
+        edits = []
+        if objects:
+            rows = self.store.rows(objects)
+            before = [getattr(self.store, column)[rows].copy() for column in columns]
+            edits.append(ColumnEdit(objects, rows, columns, before, values))
+        if groups:
+            edits.append(TransformEdit(groups, [group.transform() for group in groups], transforms))
+        if edits:
+            edit = edits[0] if len(edits) == 1 else CompoundEdit(edits)
+            edit.redo(self)
+            self.history.record(edit)
 
         return True
 
     def close_on_submit_text(self, text, window):
         if self.get_text(text):
             if len(text)>0:
-                self.objects.append(
-                    GraphicObjectFactory().create_graphic_object(self.canvas, self.start_x, self.start_y, None, None, self.color, self.mode, text=self.text)
-                )
+                with self.transaction():
+                    self.create_object(
+                        GraphicObjectFactory().create_graphic_object(self.canvas, self.start_x, self.start_y, None, None, self.color, self.mode, text=self.text)
+                    )
 
             window.destroy()
 
@@ -542,29 +3971,38 @@ class VectorGraphicEditor:
 
     ## Update View methods
     def update_all_frame(self):
+        if self.store.view.pending is not None:
+            self.frames_pending = True  # refreshed once when the transaction ends
+            return
         self.update_mode_label()
-        self.update_select_object_frame()
-        self.update_select_object_color_frame()
-        self.update_select_object_pos_frame()
-        self.update_select_object_z_frame()
+        if self.inspector is not None:
+            self.inspector.show(self.selection_leaves(), self.store)
 
     def update_mode_label(self):
-        self.mode_label.config(text=f"Mode: {self.mode}")
-
-    def update_select_object_frame(self):
-        self.select_object_frame.config(text=f"Selected Object:\n" + "\n".join([obj.get_obj_id() for obj in self.selected_objects]))
-
-    def update_select_object_color_frame(self):
-        self.select_object_color_frame.config(text=f"Object Color:\n" + "\n".join([obj.get_obj_color() for obj in self.selected_objects]))
-
-    def update_select_object_pos_frame(self):
-        self.select_object_pos_frame.config(text=f"Object Position:\n" + "\n".join([str(obj.get_obj_pos()) for obj in self.selected_objects]))
-
-    def update_select_object_z_frame(self):
-        self.select_object_z_frame.config(text=f"Object Z-order:\n" + "\n".join([str(obj.get_obj_z()) for obj in self.selected_objects]))
-
+        text = f"Mode: {self.mode}"
+        if self.svg_import is not None:
+            text += f" | Importing SVG {self.svg_import.progress():.0%}"
+        self.mode_label.config(text=text)
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ['export']:
+        # Headless batch export: python main.py export doc.json ... -o out/
+        import renderer
+        sys.exit(renderer.main(sys.argv[2:]))
+
     root = tk.Tk()
     app = VectorGraphicEditor(root)
+    profiling = sys.argv[1:2] == ['--profile']
+    if profiling:
+        # Instrumented session: python main.py --profile stats.json
+        stats_path = sys.argv[2] if len(sys.argv) > 2 else 'editor_stats.json'
+        app.instrumentation.enable()
+    app.enable_autosave()
+
+    def close():
+        if profiling:
+            app.instrumentation.dump(stats_path)
+        app.autosave.close()  # a clean exit leaves nothing to recover
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", close)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""Headless rendering of editor scenes with Pillow, and batch PNG export.
+
+Scenes are plain records (dicts) with the same fields as the graphic objects
+in main.py, so rendering needs neither a display nor a Tk canvas:
+
+    {"type": "rectangle", "x": 10, "y": 10, "width": 50, "height": 30,
+     "color": "#ff0000", "z": 0}
+
+Text records carry "text" (and "font_size" in points, 12 if missing) and
+image records carry "image_path" (and "image_data" bytes when they come from
+a .vgd document).
+"""
+import argparse
+import functools
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+import document
+
+CANVAS_WIDTH = 800
+CANVAS_HEIGHT = 600
+LINE_WIDTH = 5
+FONT_FAMILY = "Arial"
+FONT_POINTS = 12
+PIXELS_PER_POINT = 96 / 72  # Tk's default scaling on a 96 dpi display
+
+
+def object_records(objects):
+    """Convert editor GraphicObjects into render records."""
+    records = []
+    for obj in objects:
+        x, y, width, height = obj.world_geometry()  # where grouped objects appear
+        record = {
+            'type': obj.type.lower(),
+            'x': x, 'y': y,
+            'width': width, 'height': height,
+            'color': obj.color, 'z': obj.z,
+        }
+        if record['type'] == 'text':
+            record['text'] = obj.text
+            record['font_size'] = obj.world_font_size()
+        elif record['type'] == 'image':
+            record['image_path'] = obj.image_path
+            if obj.image_data is not None:  # embedded in a document or an SVG data: URI
+                record['image_data'] = obj.image_data
+        records.append(record)
+    return records
+
+
+def load_document(path):
+    """Read a scene document (.vgd or JSON) and return (width, height, records)."""
+    if path.endswith(document.EXTENSION):
+        with document.Document(path) as doc:
+            return doc.width, doc.height, list(doc.iter_records())
+    with open(path, encoding='utf-8') as f:
+        scene = json.load(f)
+    return scene.get('width', CANVAS_WIDTH), scene.get('height', CANVAS_HEIGHT), scene['objects']
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(points=FONT_POINTS):
+    size = round(points * PIXELS_PER_POINT)
+    for name in (f"{FONT_FAMILY.lower()}.ttf", f"{FONT_FAMILY}.ttf", "DejaVuSans.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def parse_color(color, default=None):
+    # Tk ignores fill=None and falls back to the item default
+    if color is None:
+        return default
+    try:
+        return ImageColor.getrgb(color)
+    except ValueError:
+        return default
+
+
+def box(record):
+    x0, y0 = record['x'], record['y']
+    x1, y1 = x0 + record.get('width', 0), y0 + record.get('height', 0)
+    return [round(min(x0, x1)), round(min(y0, y1)), round(max(x0, x1)), round(max(y0, y1))]
+
+
+def draw_record(image, draw, record):
+    kind = record['type']
+    if kind == 'rectangle':
+        color = parse_color(record.get('color'))
+        draw.rectangle(box(record), fill=color, outline=color or (0, 0, 0))
+    elif kind == 'ellipse':
+        color = parse_color(record.get('color'))
+        draw.ellipse(box(record), fill=color, outline=color or (0, 0, 0))
+    elif kind == 'line':
+        x, y = record['x'], record['y']
+        draw.line([(round(x), round(y)), (round(x + record['width']), round(y + record['height']))],
+                  fill=parse_color(record.get('color'), (0, 0, 0)), width=LINE_WIDTH)
+    elif kind == 'text':
+        # Tk anchors text at its center by default
+        draw.text((round(record['x']), round(record['y'])), record.get('text', ''),
+                  fill=parse_color(record.get('color'), (0, 0, 0)),
+                  font=get_font(record.get('font_size') or FONT_POINTS), anchor='mm')
+    elif kind == 'image':
+        data = record.get('image_data')
+        with Image.open(record['image_path'] if data is None else io.BytesIO(data)) as source:
+            source = source.convert('RGBA')
+            image.paste(source, (round(record['x']), round(record['y'])), source)
+
+
+def render(records, width=CANVAS_WIDTH, height=CANVAS_HEIGHT, background='white'):
+    """Rasterize records to a Pillow image, stacked by z like draw_by_z_order."""
+    image = Image.new('RGB', (width, height), background)
+    draw = ImageDraw.Draw(image)
+    for record in sorted(records, key=lambda record: record.get('z', 0)):
+        draw_record(image, draw, record)
+    return image
+
+
+def render_objects(objects, width=CANVAS_WIDTH, height=CANVAS_HEIGHT):
+    return render(object_records(objects), width, height)
+
+
+def output_paths(paths, out_dir):
+    """PNG path of each document in out_dir, named after the document.
+
+    Documents with the same name (a/x.json and b/x.vgd) would overwrite each
+    other's output, so later ones get a numbered name (x-2.png) instead.
+    """
+    taken = set()
+    targets = []
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, n = stem + '.png', 1
+        while os.path.normcase(name) in taken:
+            n += 1
+            name = f"{stem}-{n}.png"
+        taken.add(os.path.normcase(name))
+        targets.append(os.path.join(out_dir, name))
+    return targets
+
+
+def export_document(path, target):
+    width, height, records = load_document(path)
+    render(records, width, height).save(target)
+    return target
+
+
+def export_one(job):
+    path, target = job
+    try:
+        return path, export_document(path, target), None
+    except Exception as e:  # report and keep exporting the rest of the batch
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def batch_export(paths, out_dir, jobs=None):
+    """Export documents to PNG across a process pool, yielding (path, output, error)."""
+    os.makedirs(out_dir, exist_ok=True)
+    work = list(zip(paths, output_paths(paths, out_dir)))
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(work) <= 1:
+        yield from map(export_one, work)
+        return
+    chunksize = max(1, len(work) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(export_one, work, chunksize=chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py export", description="Render documents to PNG without a display.")
+    parser.add_argument('documents', nargs='+', help="scene documents to export")
+    parser.add_argument('-o', '--output', default='.', help="output directory (default: current directory)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for path, target, error in batch_export(args.documents, args.output, args.jobs):
+        if error is None:
+            print(f"{path} -> {target}")
+        else:
+            failed += 1
+            print(f"{path}: {error}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
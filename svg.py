@@ -0,0 +1,260 @@
+"""Streaming SVG import.
+
+The file is read with ElementTree.iterparse and every element is dropped as
+soon as it has been mapped, so memory is bounded by the depth of the element
+tree, not by the size of the drawing. Shapes become the same records as
+document.py produces (dicts for GraphicObjectFactory.create_from_record):
+
+    rect, circle, ellipse  -> rectangle / ellipse (bounding box after transforms)
+    line                   -> line
+    text                   -> text (all of its text content, at its x/y)
+    image                  -> image (relative file paths and data: URIs)
+
+Paths, polygons, <use> and anything inside <defs>, <symbol>, <clipPath>,
+<mask>, <pattern> or <marker> are skipped. Fill and stroke colors are
+inherited from groups; transforms are applied to the coordinates.
+"""
+import base64
+import math
+import os
+import re
+import urllib.parse
+import xml.etree.ElementTree as ET
+
+EXTENSION = '.svg'
+BATCH_SIZE = 4096
+UNITS = {'': 1, 'px': 1, 'pt': 96 / 72, 'pc': 16, 'mm': 96 / 25.4, 'cm': 96 / 2.54, 'in': 96}
+HIDDEN = {'defs', 'symbol', 'clipPath', 'mask', 'pattern', 'marker', 'style', 'script',
+          'title', 'desc', 'metadata', 'linearGradient', 'radialGradient', 'filter'}
+IDENTITY = (1, 0, 0, 1, 0, 0)
+
+NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+LENGTH = re.compile(r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([a-z]*)\s*$')
+TRANSFORM = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+RGB = re.compile(r'rgb\(\s*([^,\s]+)[\s,]+([^,\s]+)[\s,]+([^,\s)]+)\s*\)')
+
+
+def local_name(tag):
+    return tag.rpartition('}')[2] if isinstance(tag, str) else ''
+
+
+def parse_length(value, default=0.0):
+    match = LENGTH.match(value) if value else None
+    if match is None or match.group(2) not in UNITS:
+        return default  # missing, percentages and font-relative units
+    return float(match.group(1)) * UNITS[match.group(2)]
+
+
+def multiply(m, n):
+    # The affine matrix m applied after n, both as (a, b, c, d, e, f)
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (a * a2 + c * b2, b * a2 + d * b2,
+            a * c2 + c * d2, b * c2 + d * d2,
+            a * e2 + c * f2 + e, b * e2 + d * f2 + f)
+
+
+def parse_transform(text):
+    matrix = IDENTITY
+    for name, args in TRANSFORM.findall(text or ''):
+        v = [float(n) for n in NUMBER.findall(args)]
+        if name == 'matrix' and len(v) == 6:
+            step = tuple(v)
+        elif name == 'translate' and v:
+            step = (1, 0, 0, 1, v[0], v[1] if len(v) > 1 else 0)
+        elif name == 'scale' and v:
+            step = (v[0], 0, 0, v[1] if len(v) > 1 else v[0], 0, 0)
+        elif name == 'rotate' and v:
+            cos, sin = math.cos(math.radians(v[0])), math.sin(math.radians(v[0]))
+            step = (cos, sin, -sin, cos, 0, 0)
+            if len(v) == 3:
+                step = multiply(multiply((1, 0, 0, 1, v[1], v[2]), step), (1, 0, 0, 1, -v[1], -v[2]))
+        elif name == 'skewX' and v:
+            step = (1, 0, math.tan(math.radians(v[0])), 1, 0, 0)
+        elif name == 'skewY' and v:
+            step = (1, math.tan(math.radians(v[0])), 0, 1, 0, 0)
+        else:
+            continue
+        matrix = multiply(matrix, step)
+    return matrix
+
+
+def apply(m, x, y):
+    a, b, c, d, e, f = m
+    return a * x + c * y + e, b * x + d * y + f
+
+
+def transformed_box(m, x, y, width, height):
+    # Axis-aligned bounding box of a transformed rectangle, as (x, y, width, height)
+    points = [apply(m, px, py) for px, py in ((x, y), (x + width, y), (x, y + height), (x + width, y + height))]
+    xs, ys = [p[0] for p in points], [p[1] for p in points]
+    return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
+
+def parse_color(value):
+    # Tk color string, None for none / unsupported paints (gradients, currentColor)
+    if not value:
+        return None
+    value = value.strip()
+    if value.startswith('#') and len(value) in (4, 7):
+        return value
+    match = RGB.match(value)
+    if match:
+        channels = []
+        for channel in match.groups():
+            level = float(channel[:-1]) * 2.55 if channel.endswith('%') else float(channel)
+            channels.append(min(255, max(0, round(level))))
+        return '#%02x%02x%02x' % tuple(channels)
+    if value.isalpha() and value not in ('none', 'transparent', 'currentColor', 'inherit'):
+        return value.lower()
+    return None
+
+
+def presentation(elem):
+    # Presentation attributes, with the style attribute taking precedence
+    attrs = {name: elem.get(name) for name in ('fill', 'stroke', 'display', 'visibility') if elem.get(name) is not None}
+    for declaration in (elem.get('style') or '').split(';'):
+        name, _, value = declaration.partition(':')
+        name = name.strip()
+        if name in ('fill', 'stroke', 'display', 'visibility'):
+            attrs[name] = value.strip()
+    return attrs
+
+
+class Importer():
+    """Reads an SVG file incrementally and yields batches of object records."""
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self.batch_size = batch_size
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.count = 0    # records produced
+        self.skipped = 0  # shape-like elements that could not be mapped
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def progress(self):
+        # Fraction of the file consumed by the parser so far
+        if self.file.closed or not self.size:
+            return 1.0
+        return min(1.0, self.file.tell() / self.size)
+
+    def batches(self):
+        batch = []
+        for record in self.records():
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def records(self):
+        # One stack entry per open element: (element, matrix, fill, stroke, hidden)
+        stack = []
+        try:
+            for event, elem in ET.iterparse(self.file, events=('start', 'end')):
+                if event == 'start':
+                    stack.append(self.enter(elem, stack[-1] if stack else None))
+                    continue
+                _, matrix, fill, stroke, hidden = stack.pop()
+                name = local_name(elem.tag)
+                if not hidden and name != 'tspan':
+                    record = self.record(name, elem, matrix, fill, stroke)
+                    if record is not None:
+                        self.count += 1
+                        yield record
+                # Drop the mapped element so the tree never grows past the open path
+                if name != 'tspan' or not stack or local_name(stack[-1][0].tag) != 'text':
+                    elem.clear()
+                    if stack:
+                        stack[-1][0].remove(elem)
+        except ET.ParseError as e:
+            raise ValueError(f"{self.path}: {e}") from e
+
+    def enter(self, elem, parent):
+        name = local_name(elem.tag)
+        attrs = presentation(elem)
+        if parent is None:
+            matrix, fill, stroke, hidden = self.viewport(elem), 'black', None, False
+        else:
+            _, matrix, fill, stroke, hidden = parent
+        hidden = hidden or name in HIDDEN or attrs.get('display') == 'none' or attrs.get('visibility') == 'hidden'
+        if elem.get('transform'):
+            matrix = multiply(matrix, parse_transform(elem.get('transform')))
+        if 'fill' in attrs:
+            fill = parse_color(attrs['fill'])
+        if 'stroke' in attrs:
+            stroke = parse_color(attrs['stroke'])
+        return elem, matrix, fill, stroke, hidden
+
+    def viewport(self, elem):
+        # Map the root viewBox onto the width / height of the drawing
+        box = [float(n) for n in NUMBER.findall(elem.get('viewBox') or '')]
+        if len(box) != 4 or box[2] <= 0 or box[3] <= 0:
+            return IDENTITY
+        width = parse_length(elem.get('width'), box[2])
+        height = parse_length(elem.get('height'), box[3])
+        return multiply((width / box[2], 0, 0, height / box[3], 0, 0), (1, 0, 0, 1, -box[0], -box[1]))
+
+    def record(self, name, elem, matrix, fill, stroke):
+        get = lambda attr, default=0.0: parse_length(elem.get(attr), default)
+        if name == 'rect':
+            x, y, width, height = transformed_box(matrix, get('x'), get('y'), get('width'), get('height'))
+            return self.shape('rectangle', x, y, width, height, fill or stroke)
+        if name in ('circle', 'ellipse'):
+            rx = get('r') if name == 'circle' else get('rx')
+            ry = get('r') if name == 'circle' else get('ry')
+            cx, cy = get('cx'), get('cy')
+            x, y, width, height = transformed_box(matrix, cx - rx, cy - ry, 2 * rx, 2 * ry)
+            return self.shape('ellipse', x, y, width, height, fill or stroke)
+        if name == 'line':
+            x1, y1 = apply(matrix, get('x1'), get('y1'))
+            x2, y2 = apply(matrix, get('x2'), get('y2'))
+            return self.shape('line', x1, y1, x2 - x1, y2 - y1, stroke or fill or 'black')
+        if name == 'text':
+            text = ''.join(elem.itertext()).strip()
+            if not text:
+                return None
+            x, y = apply(matrix, get('x'), get('y'))
+            record = self.shape('text', x, y, 0, 0, fill or 'black')
+            record['text'] = text
+            return record
+        if name == 'image':
+            return self.image(elem, matrix)
+        if name in ('path', 'polygon', 'polyline', 'use'):
+            self.skipped += 1
+        return None
+
+    @staticmethod
+    def shape(kind, x, y, width, height, color):
+        return {'type': kind, 'x': x, 'y': y, 'width': width, 'height': height, 'color': color, 'z': 0}
+
+    def image(self, elem, matrix):
+        href = elem.get('href') or elem.get('{http://www.w3.org/1999/xlink}href') or ''
+        x, y = apply(matrix, parse_length(elem.get('x')), parse_length(elem.get('y')))
+        record = self.shape('image', x, y, 0, 0, 'black')
+        if href.startswith('data:'):
+            header, _, payload = href.partition(',')
+            try:
+                data = base64.b64decode(payload) if header.endswith(';base64') else urllib.parse.unquote_to_bytes(payload)
+            except ValueError:
+                self.skipped += 1
+                return None
+            record['image_path'] = None
+            record['image_data'] = data
+            return record
+        path = os.path.join(self.directory, urllib.parse.unquote(href))
+        if not href or '://' in href or not os.path.isfile(path):
+            self.skipped += 1
+            return None
+        record['image_path'] = path
+        return record